@@ -0,0 +1,166 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import LRUCache
+
+
+BLOCK_SIZES = {"1h": timedelta(hours=1), "1d": timedelta(days=1)}
+SOURCE_BLOCK_SIZE = os.getenv("SOURCE_BLOCK_SIZE", "1h")
+SOURCE_BLOCK_CACHE_MAX_BYTES = int(
+    os.getenv("SOURCE_BLOCK_CACHE_MAX_BYTES", str(256 * 1024**2))
+)
+SOURCE_BLOCK_RUN_MAX = int(os.getenv("SOURCE_BLOCK_RUN_MAX", "24"))
+# Longer windows skip the blocks and stream straight from a server-side cursor.
+SOURCE_BLOCK_WINDOW_MAX = int(os.getenv("SOURCE_BLOCK_WINDOW_MAX", "168"))
+BLOCK_VARIABLES = ["wind_speed", "power", "ambient_temperature"]
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Block(NamedTuple):
+    timestamps: np.ndarray
+    values: Dict[str, np.ndarray]
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + sum(col.nbytes for col in self.values.values())
+
+
+def as_utc(ts: datetime) -> datetime:
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def to_datetime64(values: Sequence[datetime]) -> np.ndarray:
+    return np.array(
+        [as_utc(ts).replace(tzinfo=None) for ts in values], dtype="datetime64[us]"
+    )
+
+
+def split_into_blocks(
+    rows: Sequence[Sequence], run_start: datetime, n_blocks: int, size: timedelta
+) -> List[Block]:
+    columns = list(zip(*rows)) if rows else [()] * (1 + len(BLOCK_VARIABLES))
+    timestamps = to_datetime64(columns[0])
+    values = {
+        var: np.asarray(col, dtype=np.float64)
+        for var, col in zip(BLOCK_VARIABLES, columns[1:])
+    }
+    edges = to_datetime64([run_start + size * i for i in range(n_blocks + 1)])
+    bounds = np.searchsorted(timestamps, edges)
+    # Copies, so evicting one block frees its memory instead of pinning the run.
+    return [
+        Block(
+            timestamps[lo:hi].copy(),
+            {var: col[lo:hi].copy() for var, col in values.items()},
+        )
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def blocks_to_rows(
+    blocks: Sequence[Block],
+    start: datetime,
+    end: datetime,
+    variables: List[str],
+    asset_id: Optional[int] = None,
+) -> List[tuple]:
+    if not blocks:
+        return []
+    timestamps = np.concatenate([block.timestamps for block in blocks])
+    lo, hi = np.searchsorted(timestamps, to_datetime64([start, end]))
+    if lo >= hi:
+        return []
+    columns = [
+        np.concatenate([block.values[var] for block in blocks])[lo:hi].tolist()
+        for var in variables
+    ]
+    stamps = [
+        ts.replace(tzinfo=timezone.utc) for ts in timestamps[lo:hi].astype(object)
+    ]
+    if asset_id is not None:
+        return list(zip(stamps, repeat(asset_id), *columns))
+    return list(zip(stamps, *columns))
+
+
+class SourceBlockCache:
+    # Source rows as fixed, epoch-aligned columnar blocks per asset. A range is
+    # served from cached blocks and only the missing ones are read, in runs of
+    # adjacent blocks.
+    def __init__(
+        self, block_size: timedelta, max_bytes: int, run_max: int, window_max: int
+    ):
+        self.block_size = block_size
+        self.run_max = max(run_max, 1)
+        self.window_max = window_max
+        self.blocks = LRUCache(max_bytes, max_bytes, sizeof=lambda block: block.nbytes)
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.fetched_blocks = 0
+
+    def serves(self, start: datetime, end: datetime) -> bool:
+        return end - start <= self.block_size * self.window_max
+
+    def block_floor(self, ts: datetime) -> datetime:
+        ts = as_utc(ts)
+        return EPOCH + (ts - EPOCH) // self.block_size * self.block_size
+
+    def plan(
+        self, asset_id: int, start: datetime, end: datetime
+    ) -> Iterator[Tuple[datetime, datetime, Optional[List[Block]]]]:
+        # Yields (run_start, run_end, blocks); blocks is None when the run must be
+        # fetched from the database and handed back through store().
+        end = as_utc(end)
+        cursor = self.block_floor(start)
+        run_start, run = cursor, []
+        run_cached = None
+        while cursor < end:
+            block = self.blocks.get((asset_id, cursor))
+            cached = block is not None
+            if run and (cached != run_cached or len(run) == self.run_max):
+                yield run_start, cursor, run if run_cached else None
+                run_start, run = cursor, []
+            run.append(block)
+            run_cached = cached
+            cursor += self.block_size
+        if run:
+            yield run_start, cursor, run if run_cached else None
+
+    def store(
+        self,
+        asset_id: int,
+        run_start: datetime,
+        run_end: datetime,
+        rows: Sequence[Sequence],
+    ) -> List[Block]:
+        n_blocks = (run_end - run_start) // self.block_size
+        blocks = split_into_blocks(rows, run_start, n_blocks, self.block_size)
+        # Only closed blocks with rows are kept: the current one may still receive
+        # rows, and an empty one may be a gap or an asset that is loaded later.
+        now = datetime.now(timezone.utc)
+        for i, block in enumerate(blocks):
+            block_start = run_start + self.block_size * i
+            if len(block.timestamps) and block_start + self.block_size <= now:
+                self.blocks.put((asset_id, block_start), block)
+        with self._lock:
+            self.fetches += 1
+            self.fetched_blocks += n_blocks
+        return blocks
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            fetches = {"fetches": self.fetches, "fetched_blocks": self.fetched_blocks}
+        return {**self.blocks.stats(), **fetches}
+
+
+source_block_cache = SourceBlockCache(
+    BLOCK_SIZES[SOURCE_BLOCK_SIZE],
+    SOURCE_BLOCK_CACHE_MAX_BYTES,
+    SOURCE_BLOCK_RUN_MAX,
+    SOURCE_BLOCK_WINDOW_MAX,
+)
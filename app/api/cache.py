@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, NamedTuple, Optional
+
+
+SOURCE_CACHE_MAX_BYTES = int(os.getenv("SOURCE_CACHE_MAX_BYTES", str(64 * 1024**2)))
+SOURCE_CACHE_MAX_ENTRY_BYTES = int(
+    os.getenv("SOURCE_CACHE_MAX_ENTRY_BYTES", str(SOURCE_CACHE_MAX_BYTES // 4))
+)
+SOURCE_CACHE_LIVE_TTL_S = float(os.getenv("SOURCE_CACHE_LIVE_TTL_S", "5"))
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    media_type: str
+
+
+class LRUCache:
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entry_bytes: int,
+        sizeof: Callable[[Any], int] = lambda response: len(response.body),
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry[1] is not None
+                and entry[1] <= time.monotonic()
+            ):
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> bool:
+        size = self.sizeof(value)
+        if size > self.max_entry_bytes:
+            return False
+        expires_at = None if ttl_s is None else time.monotonic() + ttl_s
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self.size_bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (value, expires_at, size)
+            self.size_bytes += size
+        return True
+
+    def _remove(self, key: Hashable) -> None:
+        self.size_bytes -= self._entries.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def window_ttl(end: datetime) -> Optional[float]:
+    # Closed windows never change; windows reaching "now" may still get rows.
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= datetime.now(timezone.utc):
+        return None
+    return SOURCE_CACHE_LIVE_TTL_S
+
+
+async def tee_into_cache(
+    chunks: AsyncIterator[bytes],
+    cache: LRUCache,
+    key: Hashable,
+    media_type: str,
+    ttl_s: Optional[float],
+    row_count: Callable[[], int],
+) -> AsyncIterator[bytes]:
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size > cache.max_entry_bytes:
+                parts = None
+            else:
+                parts.append(chunk)
+        yield chunk
+    # An empty closed window would be cached for good, but rows may still be
+    # loaded into it later (a gap, or an asset seeded afterwards).
+    if parts is not None and row_count() > 0:
+        cache.put(key, CachedResponse(b"".join(parts), media_type), ttl_s)
+
+
+source_data_cache = LRUCache(SOURCE_CACHE_MAX_BYTES, SOURCE_CACHE_MAX_ENTRY_BYTES)
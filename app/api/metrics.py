@@ -0,0 +1,225 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db import common
+
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG_CHARS = 500
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BYTE_BUCKETS = tuple(4**exponent * 256 for exponent in range(12))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start until the last body byte is sent",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    "http_response_bytes",
+    "Response body size",
+    ["method", "route"],
+    buckets=BYTE_BUCKETS,
+)
+RESPONSE_ROWS = Histogram(
+    "http_response_rows",
+    "Rows encoded into the response body (responses served from cache are not counted)",
+    ["method", "route"],
+    buckets=ROW_BUCKETS,
+)
+STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time, until the first rows are available",
+    ["database", "statement"],
+    buckets=LATENCY_BUCKETS,
+)
+STATEMENT_ROWS = Histogram(
+    "db_statement_rows",
+    "Rows reported by the driver for a SQL statement",
+    ["database", "statement"],
+    buckets=ROW_BUCKETS,
+)
+SLOW_STATEMENTS = Counter(
+    "db_slow_statements",
+    "SQL statements slower than DB_SLOW_QUERY_MS",
+    ["database", "statement"],
+)
+
+slow_query_log = logging.getLogger("api.slow_query")
+
+
+class RowCount:
+    def __init__(self):
+        self.rows: Optional[int] = None
+
+    def add(self, rows: int) -> None:
+        self.rows = (self.rows or 0) + rows
+
+
+_request_rows: ContextVar[Optional[RowCount]] = ContextVar("request_rows", default=None)
+
+
+def record_rows(rows: int) -> None:
+    # Encoders may run in threadpool workers; they share the request's counter
+    # because the contextvar holds the same mutable object in the copied context.
+    counter = _request_rows.get()
+    if counter is not None:
+        counter.add(rows)
+
+
+def route_label(scope) -> str:
+    # The route template keeps the label set bounded, whatever the query.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    # Plain ASGI: a StreamingResponse is only timed when its last chunk is sent.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        body_bytes = 0
+        counter = RowCount()
+        token = _request_rows.set(counter)
+
+        async def send_with_metrics(message):
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _request_rows.reset(token)
+            method, route = scope["method"], route_label(scope)
+            REQUEST_LATENCY.labels(method, route, str(status)).observe(
+                time.perf_counter() - started
+            )
+            RESPONSE_BYTES.labels(method, route).observe(body_bytes)
+            if counter.rows is not None:
+                RESPONSE_ROWS.labels(method, route).observe(counter.rows)
+
+
+def statement_label(statement: str) -> str:
+    words = statement.lstrip("( \n").split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+    database = conn.engine.url.database or "unknown"
+    kind = statement_label(statement)
+    STATEMENT_LATENCY.labels(database, kind).observe(elapsed)
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount is not None and rowcount >= 0:
+        STATEMENT_ROWS.labels(database, kind).observe(rowcount)
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        SLOW_STATEMENTS.labels(database, kind).inc()
+        slow_query_log.warning(
+            "slow query: %.1f ms db=%s rows=%s %s",
+            elapsed * 1000,
+            database,
+            rowcount,
+            " ".join(statement.split())[:SLOW_QUERY_LOG_CHARS],
+        )
+
+
+def handle_error(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute.
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("statement_started"):
+        conn.info["statement_started"].pop()
+
+
+def instrument_sqlalchemy() -> None:
+    # Listening on the Engine class covers every engine, including the sync
+    # engine behind each AsyncEngine and engines created after startup.
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(Engine, "handle_error", handle_error)
+
+
+class PoolCollector:
+    # Read at scrape time from the engine registry, like /health/pools.
+    GAUGES = ["size", "checked_out", "checked_in", "overflow"]
+    COUNTERS = ["connects", "checkouts", "checkins", "wait_seconds", "timeouts"]
+
+    def collect(self) -> List[GaugeMetricFamily]:
+        status = common.pool_status()
+        families = []
+        for name in self.GAUGES + self.COUNTERS:
+            family_class = GaugeMetricFamily
+            if name in self.COUNTERS:
+                family_class = CounterMetricFamily
+            family = family_class(
+                f"db_pool_{name}", f"Connection pool {name}", labels=["pool"]
+            )
+            for pool, values in status.items():
+                family.add_metric([pool], values[name])
+            families.append(family)
+        return families
+
+
+_pool_collector: Optional[PoolCollector] = None
+
+
+def register_pool_collector() -> None:
+    # Called at app startup, so importing this module (e.g. for record_rows
+    # in the encoders) has no effect on the global registry.
+    global _pool_collector
+    if _pool_collector is None:
+        _pool_collector = PoolCollector()
+        REGISTRY.register(_pool_collector)
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,10 @@
 import os
 from fastapi import APIRouter
 
+from db import common
+from .blocks import source_block_cache
+from .cache import source_data_cache
+
 
 router = APIRouter()
 
@@ -20,3 +24,16 @@ def health_check():
             "target": os.getenv("DB_TARGET_NAME", "target"),
         },
     }
+
+
+@router.get("/health/pools")
+def pool_health():
+    return common.pool_status()
+
+
+@router.get("/health/cache")
+def cache_health():
+    return {
+        "source_data": source_data_cache.stats(),
+        "source_blocks": source_block_cache.stats(),
+    }
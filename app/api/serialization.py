@@ -0,0 +1,217 @@
+import io
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from starlette.concurrency import run_in_threadpool
+
+from .metrics import record_rows
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+# Every other non-timestamp column is a float64 measurement.
+COLUMN_TYPES = {"asset_id": pa.int32()}
+
+
+def encode_json_records(
+    columns: List[str], rows: Sequence[Sequence[Any]], defaults: Dict[str, Any]
+) -> bytes:
+    # A JSON array of objects without a model per row. defaults fixes the key
+    # order and fills keys missing from the rows; orjson renders the datetimes
+    # (UTC as "Z") and NaN as null.
+    items = []
+    for row in rows:
+        item = defaults.copy()
+        item.update(zip(columns, row))
+        items.append(item)
+    return orjson.dumps(items, option=orjson.OPT_UTC_Z)
+
+
+def encode_json_row(columns: List[str], row: Sequence[Any]) -> bytes:
+    # Same rendering as encode_json_records: "Z" datetimes and NaN as null.
+    return orjson.dumps(
+        dict(zip(columns, row)),
+        option=orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+
+class NDJSONEncoder:
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.rows = 0
+
+    def begin(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if not rows:
+            return b""
+        return b"".join(encode_json_row(self.columns, row) + b"\n" for row in rows)
+
+    def end(self) -> bytes:
+        return b""
+
+
+class JSONArrayEncoder:
+    # A JSON array written row by row, for clients that cannot read NDJSON.
+    media_type = "application/json"
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.rows = 0
+        self._separator = b""
+
+    def begin(self) -> bytes:
+        return b"["
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if not rows:
+            return b""
+        chunk = self._separator + b",".join(
+            encode_json_row(self.columns, row) for row in rows
+        )
+        self._separator = b","
+        return chunk
+
+    def end(self) -> bytes:
+        return b"]"
+
+
+def build_arrow_schema(columns: List[str]) -> pa.Schema:
+    fields = [pa.field(columns[0], pa.timestamp("us", tz="UTC"), nullable=False)]
+    fields += [
+        pa.field(name, COLUMN_TYPES.get(name, pa.float64())) for name in columns[1:]
+    ]
+    return pa.schema(fields)
+
+
+def rows_to_record_batch(
+    schema: pa.Schema, rows: Sequence[Sequence[Any]]
+) -> pa.RecordBatch:
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = [
+        pa.array(values, type=field.type) for values, field in zip(columns, schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ArrowStreamEncoder:
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+    def __init__(self, columns: List[str]):
+        self.schema = build_arrow_schema(columns)
+        self.rows = 0
+        self._sink = io.BytesIO()
+        self._writer = None
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def begin(self) -> bytes:
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+        return self._drain()
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if not rows:
+            return b""
+        self._writer.write_batch(rows_to_record_batch(self.schema, rows))
+        return self._drain()
+
+    def end(self) -> bytes:
+        self._writer.close()
+        return self._drain()
+
+
+class ParquetEncoder:
+    # Parquet keeps its metadata in a footer, so the file is emitted at the end.
+    media_type = PARQUET_MEDIA_TYPE
+
+    def __init__(self, columns: List[str]):
+        self.schema = build_arrow_schema(columns)
+        self.rows = 0
+        self._batches: List[pa.RecordBatch] = []
+
+    def begin(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if rows:
+            self._batches.append(rows_to_record_batch(self.schema, rows))
+        return b""
+
+    def end(self) -> bytes:
+        sink = io.BytesIO()
+        table = pa.Table.from_batches(self._batches, schema=self.schema)
+        pq.write_table(table, sink)
+        return sink.getvalue()
+
+
+ENCODERS = {
+    "ndjson": NDJSONEncoder,
+    "arrow": ArrowStreamEncoder,
+    "parquet": ParquetEncoder,
+}
+MEDIA_TYPE_TO_FORMAT = {encoder.media_type: name for name, encoder in ENCODERS.items()}
+
+
+def negotiate_format(accept: Optional[str]) -> Optional[str]:
+    if not accept:
+        return None
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in MEDIA_TYPE_TO_FORMAT:
+            return MEDIA_TYPE_TO_FORMAT[media_type]
+    return None
+
+
+def iter_encoded(
+    encoder, partitions: Iterable[Sequence[Sequence[Any]]]
+) -> Iterator[bytes]:
+    header = encoder.begin()
+    if header:
+        yield header
+    for rows in partitions:
+        record_rows(len(rows))
+        encoder.rows += len(rows)
+        chunk = encoder.encode(rows)
+        if chunk:
+            yield chunk
+    footer = encoder.end()
+    if footer:
+        yield footer
+
+
+async def aiter_encoded(
+    encoder, partitions: AsyncIterable[Sequence[Sequence[Any]]]
+) -> AsyncIterator[bytes]:
+    header = encoder.begin()
+    if header:
+        yield header
+    # Encoding is CPU-bound (and Parquet writes the whole file at the end), so
+    # it runs off the event loop.
+    async for rows in partitions:
+        record_rows(len(rows))
+        encoder.rows += len(rows)
+        chunk = await run_in_threadpool(encoder.encode, rows)
+        if chunk:
+            yield chunk
+    footer = await run_in_threadpool(encoder.end)
+    if footer:
+        yield footer
@@ -1,13 +1,28 @@
-from datetime import datetime
-from typing import List, Optional
+import asyncio
+import base64
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.engine import Row
 
-from db.source_session import get_source_session
-from db.source_setup import SourceData
+from db.source_session import open_source_session
+from db.source_setup import DEFAULT_ASSET_ID, Asset, SourceData
+from .blocks import BLOCK_VARIABLES, as_utc, blocks_to_rows, source_block_cache
+from .cache import CachedResponse, source_data_cache, tee_into_cache, window_ttl
+from .metrics import record_rows
+from .serialization import (
+    ENCODERS,
+    encode_json_records,
+    iter_encoded,
+    negotiate_format,
+)
 
 
 router = APIRouter(prefix="/source", tags=["source"])
@@ -18,19 +33,65 @@ VARIABLE_TO_COLUMN_MAP = {
     "power": SourceData.power,
     "ambient_temperature": SourceData.ambient_temperature.label("ambient_temperature"),
 }
+OUTPUT_FORMATS = ["json", *ENCODERS]
+STREAM_CHUNK_ROWS = int(os.getenv("SOURCE_STREAM_CHUNK_ROWS", "1000"))
+STREAM_MAX_CONCURRENCY = int(os.getenv("SOURCE_STREAM_MAX_CONCURRENCY", "10"))
+# Largest page a client may ask for; a bigger limit is clamped.
+DATA_PAGE_MAX_ROWS = int(os.getenv("SOURCE_DATA_PAGE_MAX_ROWS", "100000"))
+# When > 0, every /source/data request is paginated with at most this many rows.
+DATA_MAX_ROWS = int(os.getenv("SOURCE_DATA_MAX_ROWS", "0"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+LIMIT_DESCRIPTION = (
+    f"Page size, at most {DATA_PAGE_MAX_ROWS} rows. When more rows follow, "
+    f"the {NEXT_CURSOR_HEADER} response header holds the cursor of the next page"
+)
+CURSOR_DESCRIPTION = (
+    f"Opaque {NEXT_CURSOR_HEADER} value of the previous page; "
+    "repeat the other parameters unchanged"
+)
+
+AGG_STAT_TO_FUNC = {
+    "mean": func.avg,
+    "min": func.min,
+    "max": func.max,
+    "std": func.stddev_samp,
+    "count": func.count,
+}
+DEFAULT_AGG_STATS = ["mean", "min", "max", "std"]
+INTERVAL_UNITS = {"min": "minutes", "h": "hours", "d": "days"}
+INTERVAL_PATTERN = re.compile(r"^(\d+)(min|h|d)$")
+# Buckets are aligned to midnight UTC, like pandas' resample default.
+BUCKET_ORIGIN = datetime(2000, 1, 1, tzinfo=timezone.utc)
 
 
 class DataQueryResponse(BaseModel):
     timestamp: datetime
+    asset_id: Optional[int] = None
     wind_speed: Optional[float] = None
     power: Optional[float] = None
     ambient_temperature: Optional[float] = None
 
 
+class AssetResponse(BaseModel):
+    id: int
+    name: str
+
+
+class DataPage(NamedTuple):
+    limit: int
+    # Last (asset_id, timestamp) served by the previous page.
+    after: Optional[Tuple[int, datetime]]
+
+
 class DataQueryParams(BaseModel):
     start: datetime
     end: datetime
     variables: List[str]
+    asset_ids: List[int] = [DEFAULT_ASSET_ID]
+
+    @property
+    def multi_asset(self) -> bool:
+        return len(self.asset_ids) > 1
 
     @classmethod
     def validate_variables(cls, var_list: List[str]) -> List[str]:
@@ -42,38 +103,385 @@ class DataQueryParams(BaseModel):
         return var_list
 
 
-@router.get("/data", response_model=List[DataQueryResponse])
-def get_source_data(
-    start: datetime = Query(..., description="Start timestamp (inclusive)"),
-    end: datetime = Query(..., description="End timestamp (exclusive)"),
-    variables: List[str] = Query(DEFAULT_VARIABLES, description="Variables to return"),
-    session: Session = Depends(get_source_session),
-):
+JSON_MEDIA_TYPE = "application/json"
+ASSET_ID_DESCRIPTION = (
+    f"Asset ids, repeatable (default {DEFAULT_ASSET_ID}). "
+    "With more than one, rows carry asset_id and are ordered by asset, then time"
+)
+
+
+def parse_interval(interval: str) -> timedelta:
+    match = INTERVAL_PATTERN.match(interval.strip())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid interval: {interval}. Expected e.g. 10min, 1h or 1d")
+    return timedelta(**{INTERVAL_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def resolve_format(format: Optional[str], accept: Optional[str]) -> str:
+    format = format or negotiate_format(accept) or "json"
+    if format not in OUTPUT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format: {format}. Allowed: {OUTPUT_FORMATS}",
+        )
+    return format
+
+
+def parse_data_params(
+    start: datetime,
+    end: datetime,
+    variables: List[str],
+    asset_ids: Optional[List[int]] = None,
+) -> DataQueryParams:
+    asset_ids = list(dict.fromkeys(asset_ids or [DEFAULT_ASSET_ID]))
     try:
-        params = DataQueryParams(start=start, end=end, variables=variables)
+        params = DataQueryParams(
+            start=start, end=end, variables=variables, asset_ids=asset_ids
+        )
+        DataQueryParams.validate_variables(params.variables)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     if params.start >= params.end:
         raise HTTPException(status_code=400, detail="start must be before end")
+    return params
+
+
+def encode_cursor(asset_id: int, timestamp: datetime) -> str:
+    token = f"{asset_id},{as_utc(timestamp).isoformat()}".encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, datetime]:
+    try:
+        token = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        asset_id, timestamp = token.decode().split(",", 1)
+        return int(asset_id), as_utc(datetime.fromisoformat(timestamp))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
 
+def parse_data_page(
+    params: DataQueryParams, limit: Optional[int], cursor: Optional[str]
+) -> Optional[DataPage]:
+    if limit is None and cursor is None and DATA_MAX_ROWS <= 0:
+        return None
+    limit = min(limit or DATA_PAGE_MAX_ROWS, DATA_PAGE_MAX_ROWS)
+    if DATA_MAX_ROWS > 0:
+        limit = min(limit, DATA_MAX_ROWS)
+    after = decode_cursor(cursor) if cursor is not None else None
+    if after is not None and after[0] not in params.asset_ids:
+        raise HTTPException(status_code=400, detail="Cursor does not match asset_id")
+    return DataPage(limit, after)
+
+
+def data_columns(params: DataQueryParams) -> List[str]:
+    # One asset keeps the single-turbine row shape; several add an asset_id column.
+    asset_column = ["asset_id"] if params.multi_asset else []
+    return ["timestamp", *asset_column, *params.variables]
+
+
+def parse_aggregate_params(
+    start: datetime,
+    end: datetime,
+    variables: List[str],
+    interval: str,
+    stats: List[str],
+    asset_ids: Optional[List[int]] = None,
+) -> Tuple[DataQueryParams, timedelta]:
+    try:
+        bucket_interval = parse_interval(interval)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    invalid = [stat for stat in stats if stat not in AGG_STAT_TO_FUNC]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid stats: {invalid}. Allowed: {list(AGG_STAT_TO_FUNC)}",
+        )
+    return parse_data_params(start, end, variables, asset_ids), bucket_interval
+
+
+def build_data_query(params: DataQueryParams):
     selected_cols = [SourceData.timestamp]
+    if params.multi_asset:
+        selected_cols.append(SourceData.asset_id)
     for var in params.variables:
         selected_cols.append(VARIABLE_TO_COLUMN_MAP[var])
 
-    stmt = (
+    return (
+        select(*selected_cols)
+        .where(SourceData.asset_id.in_(params.asset_ids))
+        .where(SourceData.timestamp >= params.start)
+        .where(SourceData.timestamp < params.end)
+        .order_by(SourceData.asset_id, SourceData.timestamp)
+    )
+
+
+def data_cache_key(params: DataQueryParams, format: str) -> tuple:
+    return (
+        params.start,
+        params.end,
+        tuple(params.variables),
+        tuple(params.asset_ids),
+        format,
+    )
+
+
+def encode_data_json(params: DataQueryParams, rows: List[tuple]) -> bytes:
+    # Same bytes as List[DataQueryResponse] dumped by pydantic: every field, in
+    # model order, unrequested variables as null.
+    defaults = dict.fromkeys(DataQueryResponse.model_fields)
+    if not params.multi_asset:
+        defaults["asset_id"] = params.asset_ids[0]
+    return encode_json_records(data_columns(params), rows, defaults)
+
+
+def build_data_page_query(params: DataQueryParams, page: DataPage):
+    # Keyset on the (asset_id, timestamp) primary key: every page is one index
+    # range scan from the cursor, however deep into the window it starts.
+    stmt = build_data_query(params).limit(page.limit + 1)
+    if page.after is not None:
+        stmt = stmt.where(
+            tuple_(SourceData.asset_id, SourceData.timestamp) > tuple_(*page.after)
+        )
+    return stmt
+
+
+def data_page_response(
+    params: DataQueryParams, format: str, page: DataPage, rows: List[Row]
+) -> Response:
+    # One extra row was read to tell whether another page follows.
+    more = len(rows) > page.limit
+    rows = [(as_utc(row[0]), *row[1:]) for row in rows[: page.limit]]
+    headers = {}
+    if more:
+        asset_id = rows[-1][1] if params.multi_asset else params.asset_ids[0]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(asset_id, rows[-1][0])
+
+    if format in ENCODERS:
+        encoder = ENCODERS[format](data_columns(params))
+        body = b"".join(iter_encoded(encoder, [rows]))
+        return Response(body, media_type=encoder.media_type, headers=headers)
+    record_rows(len(rows))
+    body = encode_data_json(params, rows)
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def cached_data_response(params: DataQueryParams, format: str):
+    cached = source_data_cache.get(data_cache_key(params, format))
+    if cached is None:
+        return None
+    return Response(cached.body, media_type=cached.media_type)
+
+
+def cache_data_stream(params: DataQueryParams, format: str, chunks, encoder):
+    return StreamingResponse(
+        tee_into_cache(
+            chunks,
+            source_data_cache,
+            data_cache_key(params, format),
+            encoder.media_type,
+            window_ttl(params.end),
+            lambda: encoder.rows,
+        ),
+        media_type=encoder.media_type,
+    )
+
+
+def cache_data_json(params: DataQueryParams, rows: List[tuple]) -> Response:
+    record_rows(len(rows))
+    body = encode_data_json(params, rows)
+    if rows:
+        source_data_cache.put(
+            data_cache_key(params, "json"),
+            CachedResponse(body, JSON_MEDIA_TYPE),
+            window_ttl(params.end),
+        )
+    return Response(body, media_type=JSON_MEDIA_TYPE)
+
+
+def build_aggregate_query(
+    params: DataQueryParams, interval: timedelta, stats: List[str]
+):
+    bucket = func.date_bin(interval, SourceData.timestamp, BUCKET_ORIGIN)
+    group = [SourceData.asset_id] if params.multi_asset else []
+    selected_cols = [bucket.label("timestamp"), *group]
+    for var in params.variables:
+        column = getattr(SourceData, var)
+        for stat in stats:
+            selected_cols.append(AGG_STAT_TO_FUNC[stat](column).label(f"{var}_{stat}"))
+
+    return (
         select(*selected_cols)
+        .where(SourceData.asset_id.in_(params.asset_ids))
         .where(SourceData.timestamp >= params.start)
         .where(SourceData.timestamp < params.end)
-        .order_by(SourceData.timestamp)
+        .group_by(*group, bucket)
+        .order_by(*group, bucket)
     )
 
-    rows = session.execute(stmt).all()
-    results: List[DataQueryResponse] = []
-    for row in rows:
-        item = {"timestamp": row[0]}
-        for idx, var in enumerate(params.variables, start=1):
-            item[var] = row[idx]
-        results.append(DataQueryResponse(**item))
 
-    return results
+def aggregate_columns(params: DataQueryParams, stats: List[str]) -> List[str]:
+    asset_column = ["asset_id"] if params.multi_asset else []
+    return [
+        "timestamp",
+        *asset_column,
+        *[f"{var}_{stat}" for var in params.variables for stat in stats],
+    ]
+
+
+_stream_slots: Optional[asyncio.Semaphore] = None
+
+
+def fetch_all(stmt) -> List[Row]:
+    # The connection goes back to the pool before the handler returns. With a
+    # yield dependency, the close would wait for a free threadpool worker while
+    # other workers sit blocked on the exhausted pool.
+    with open_source_session() as session:
+        return session.execute(stmt).all()
+
+
+def iter_source_rows(stmt, encoder):
+    # Owns its session: the request-scoped one is closed before the body is sent.
+    with open_source_session() as session:
+        result = session.execute(
+            stmt, execution_options={"yield_per": STREAM_CHUNK_ROWS}
+        )
+        yield from iter_encoded(encoder, result.partitions())
+
+
+def block_query(asset_id: int, run_start: datetime, run_end: datetime):
+    return build_data_query(
+        DataQueryParams(
+            start=run_start,
+            end=run_end,
+            variables=BLOCK_VARIABLES,
+            asset_ids=[asset_id],
+        )
+    )
+
+
+def iter_data_partitions(params: DataQueryParams):
+    # Assets are served one after the other, each from its own blocks. Only one
+    # run of at most SOURCE_BLOCK_RUN_MAX blocks is held in memory at a time.
+    for asset_id in params.asset_ids:
+        plan = source_block_cache.plan(asset_id, params.start, params.end)
+        for run_start, run_end, blocks in plan:
+            if blocks is None:
+                rows = fetch_all(block_query(asset_id, run_start, run_end))
+                blocks = source_block_cache.store(asset_id, run_start, run_end, rows)
+            rows = blocks_to_rows(
+                blocks,
+                params.start,
+                params.end,
+                params.variables,
+                asset_id if params.multi_asset else None,
+            )
+            if rows:
+                yield rows
+
+
+async def stream_in_threadpool(chunks):
+    # A stream keeps its pooled connection across threadpool hops. Waiting for a
+    # slot on the event loop, instead of inside a worker thread, keeps streams
+    # queued for a connection from starving the ones that already hold one.
+    global _stream_slots
+    if _stream_slots is None:
+        _stream_slots = asyncio.Semaphore(STREAM_MAX_CONCURRENCY)
+    async with _stream_slots:
+        try:
+            async for chunk in iterate_in_threadpool(chunks):
+                yield chunk
+        finally:
+            await run_in_threadpool(chunks.close)
+
+
+@router.get("/assets", response_model=List[AssetResponse])
+def get_source_assets():
+    return [
+        AssetResponse(id=asset_id, name=name)
+        for asset_id, name in fetch_all(select(Asset.id, Asset.name).order_by(Asset.id))
+    ]
+
+
+@router.get("/data", response_model=List[DataQueryResponse])
+def get_source_data(
+    start: datetime = Query(..., description="Start timestamp (inclusive)"),
+    end: datetime = Query(..., description="End timestamp (exclusive)"),
+    variables: List[str] = Query(DEFAULT_VARIABLES, description="Variables to return"),
+    asset_id: Optional[List[int]] = Query(None, description=ASSET_ID_DESCRIPTION),
+    format: Optional[str] = Query(
+        None,
+        description=f"Output format: {OUTPUT_FORMATS}. Defaults to the Accept header, then json",
+    ),
+    limit: Optional[int] = Query(None, ge=1, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    accept: Optional[str] = Header(None),
+):
+    params = parse_data_params(start, end, variables, asset_id)
+    format = resolve_format(format, accept)
+
+    page = parse_data_page(params, limit, cursor)
+    if page is not None:
+        rows = fetch_all(build_data_page_query(params, page))
+        return data_page_response(params, format, page, rows)
+
+    cached = cached_data_response(params, format)
+    if cached is not None:
+        return cached
+
+    use_blocks = source_block_cache.serves(params.start, params.end)
+
+    if format in ENCODERS:
+        encoder = ENCODERS[format](data_columns(params))
+        if use_blocks:
+            chunks = iter_encoded(encoder, iter_data_partitions(params))
+        else:
+            chunks = iter_source_rows(build_data_query(params), encoder)
+        return cache_data_stream(params, format, stream_in_threadpool(chunks), encoder)
+
+    if use_blocks:
+        rows = [row for rows in iter_data_partitions(params) for row in rows]
+    else:
+        rows = fetch_all(build_data_query(params))
+    return cache_data_json(params, rows)
+
+
+@router.get("/aggregate", response_model=List[Dict[str, Any]])
+def get_source_aggregate(
+    start: datetime = Query(..., description="Start timestamp (inclusive)"),
+    end: datetime = Query(..., description="End timestamp (exclusive)"),
+    interval: str = Query("10min", description="Bucket size, e.g. 10min, 1h, 1d"),
+    variables: List[str] = Query(
+        DEFAULT_VARIABLES, description="Variables to aggregate"
+    ),
+    stats: List[str] = Query(
+        DEFAULT_AGG_STATS, description=f"Statistics: {list(AGG_STAT_TO_FUNC)}"
+    ),
+    asset_id: Optional[List[int]] = Query(None, description=ASSET_ID_DESCRIPTION),
+    format: Optional[str] = Query(
+        None,
+        description=f"Output format: {OUTPUT_FORMATS}. Defaults to the Accept header, then json",
+    ),
+    accept: Optional[str] = Header(None),
+):
+    params, bucket_interval = parse_aggregate_params(
+        start, end, variables, interval, stats, asset_id
+    )
+    format = resolve_format(format, accept)
+
+    stmt = build_aggregate_query(params, bucket_interval, stats)
+    columns = aggregate_columns(params, stats)
+
+    if format in ENCODERS:
+        encoder = ENCODERS[format](columns)
+        return StreamingResponse(
+            stream_in_threadpool(iter_source_rows(stmt, encoder)),
+            media_type=encoder.media_type,
+        )
+
+    rows = fetch_all(stmt)
+    record_rows(len(rows))
+    return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from db.source_session import get_async_source_session, open_async_source_session
+from .blocks import blocks_to_rows, source_block_cache
+from .metrics import record_rows
+from .serialization import ENCODERS, aiter_encoded
+from .source import (
+    AGG_STAT_TO_FUNC,
+    ASSET_ID_DESCRIPTION,
+    CURSOR_DESCRIPTION,
+    DEFAULT_AGG_STATS,
+    DEFAULT_VARIABLES,
+    LIMIT_DESCRIPTION,
+    OUTPUT_FORMATS,
+    STREAM_CHUNK_ROWS,
+    DataQueryParams,
+    DataQueryResponse,
+    aggregate_columns,
+    block_query,
+    build_aggregate_query,
+    build_data_page_query,
+    build_data_query,
+    cache_data_json,
+    cache_data_stream,
+    cached_data_response,
+    data_columns,
+    data_page_response,
+    parse_aggregate_params,
+    parse_data_page,
+    parse_data_params,
+    resolve_format,
+)
+
+
+router = APIRouter(prefix="/async/source", tags=["source-async"])
+
+
+async def stream_source_rows_async(stmt, encoder):
+    async with open_async_source_session() as session:
+        result = await session.stream(
+            stmt, execution_options={"yield_per": STREAM_CHUNK_ROWS}
+        )
+        async for chunk in aiter_encoded(encoder, result.partitions()):
+            yield chunk
+
+
+async def aiter_data_partitions(params: DataQueryParams):
+    # Splitting rows into blocks and back is CPU-bound; it runs off the event loop.
+    for asset_id in params.asset_ids:
+        plan = source_block_cache.plan(asset_id, params.start, params.end)
+        for run_start, run_end, blocks in plan:
+            if blocks is None:
+                stmt = block_query(asset_id, run_start, run_end)
+                async with open_async_source_session() as session:
+                    rows = (await session.execute(stmt)).all()
+                blocks = await run_in_threadpool(
+                    source_block_cache.store, asset_id, run_start, run_end, rows
+                )
+            rows = await run_in_threadpool(
+                blocks_to_rows,
+                blocks,
+                params.start,
+                params.end,
+                params.variables,
+                asset_id if params.multi_asset else None,
+            )
+            if rows:
+                yield rows
+
+
+@router.get("/data", response_model=List[DataQueryResponse])
+async def get_source_data_async(
+    start: datetime = Query(..., description="Start timestamp (inclusive)"),
+    end: datetime = Query(..., description="End timestamp (exclusive)"),
+    variables: List[str] = Query(DEFAULT_VARIABLES, description="Variables to return"),
+    asset_id: Optional[List[int]] = Query(None, description=ASSET_ID_DESCRIPTION),
+    format: Optional[str] = Query(
+        None,
+        description=f"Output format: {OUTPUT_FORMATS}. Defaults to the Accept header, then json",
+    ),
+    limit: Optional[int] = Query(None, ge=1, description=LIMIT_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    accept: Optional[str] = Header(None),
+):
+    params = parse_data_params(start, end, variables, asset_id)
+    format = resolve_format(format, accept)
+
+    page = parse_data_page(params, limit, cursor)
+    if page is not None:
+        stmt = build_data_page_query(params, page)
+        async with open_async_source_session() as session:
+            rows = (await session.execute(stmt)).all()
+        return await run_in_threadpool(data_page_response, params, format, page, rows)
+
+    cached = cached_data_response(params, format)
+    if cached is not None:
+        return cached
+
+    use_blocks = source_block_cache.serves(params.start, params.end)
+
+    if format in ENCODERS:
+        encoder = ENCODERS[format](data_columns(params))
+        if use_blocks:
+            chunks = aiter_encoded(encoder, aiter_data_partitions(params))
+        else:
+            chunks = stream_source_rows_async(build_data_query(params), encoder)
+        return cache_data_stream(params, format, chunks, encoder)
+
+    if use_blocks:
+        rows = [row async for rows in aiter_data_partitions(params) for row in rows]
+    else:
+        async with open_async_source_session() as session:
+            rows = (await session.execute(build_data_query(params))).all()
+    return await run_in_threadpool(cache_data_json, params, rows)
+
+
+@router.get("/aggregate", response_model=List[Dict[str, Any]])
+async def get_source_aggregate_async(
+    start: datetime = Query(..., description="Start timestamp (inclusive)"),
+    end: datetime = Query(..., description="End timestamp (exclusive)"),
+    interval: str = Query("10min", description="Bucket size, e.g. 10min, 1h, 1d"),
+    variables: List[str] = Query(
+        DEFAULT_VARIABLES, description="Variables to aggregate"
+    ),
+    stats: List[str] = Query(
+        DEFAULT_AGG_STATS, description=f"Statistics: {list(AGG_STAT_TO_FUNC)}"
+    ),
+    asset_id: Optional[List[int]] = Query(None, description=ASSET_ID_DESCRIPTION),
+    format: Optional[str] = Query(
+        None,
+        description=f"Output format: {OUTPUT_FORMATS}. Defaults to the Accept header, then json",
+    ),
+    accept: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_source_session),
+):
+    params, bucket_interval = parse_aggregate_params(
+        start, end, variables, interval, stats, asset_id
+    )
+    format = resolve_format(format, accept)
+
+    stmt = build_aggregate_query(params, bucket_interval, stats)
+    columns = aggregate_columns(params, stats)
+
+    if format in ENCODERS:
+        encoder = ENCODERS[format](columns)
+        return StreamingResponse(
+            stream_source_rows_async(stmt, encoder), media_type=encoder.media_type
+        )
+
+    rows = (await session.execute(stmt)).all()
+    record_rows(len(rows))
+    return [dict(zip(columns, row)) for row in rows]
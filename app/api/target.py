@@ -0,0 +1,175 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from db.source_setup import DEFAULT_ASSET_ID
+from db.target_session import open_target_session
+from db.target_setup import RESOLUTION_SUFFIXES, Measurement, Signal
+from .serialization import ENCODERS, JSONArrayEncoder, iter_encoded
+from .source import (
+    OUTPUT_FORMATS,
+    STREAM_CHUNK_ROWS,
+    resolve_format,
+    stream_in_threadpool,
+)
+
+
+router = APIRouter(prefix="/target", tags=["target"])
+
+TARGET_ENCODERS = {"json": JSONArrayEncoder, **ENCODERS}
+
+
+class SignalCache:
+    # Signals are only ever added, so an (asset, name) missing from the cache
+    # triggers one reload of the whole table instead of a join on every query.
+    # Listings can't detect a miss; they reload when count or max(id) changed.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_to_id: Dict[Tuple[int, str], int] = {}
+        self._version: Optional[Tuple[int, Optional[int]]] = None
+        self.refreshes = 0
+
+    def refresh(self) -> Dict[Tuple[int, str], int]:
+        with open_target_session() as session:
+            rows = session.execute(select(Signal.asset_id, Signal.name, Signal.id))
+            key_to_id = {
+                (asset_id, name): signal_id for asset_id, name, signal_id in rows
+            }
+        with self._lock:
+            self._key_to_id = key_to_id
+            self._version = (len(key_to_id), max(key_to_id.values(), default=None))
+            self.refreshes += 1
+        return key_to_id
+
+    def current(self) -> Dict[Tuple[int, str], int]:
+        with open_target_session() as session:
+            version = session.execute(select(func.count(), func.max(Signal.id))).one()
+        if tuple(version) != self._version:
+            return self.refresh()
+        return self._key_to_id
+
+    def names(self, asset_id: int) -> List[str]:
+        return sorted(name for owner, name in self.refresh() if owner == asset_id)
+
+    def resolve(self, asset_id: int, names: List[str]) -> Dict[str, int]:
+        key_to_id = self._key_to_id
+        if any((asset_id, name) not in key_to_id for name in names):
+            key_to_id = self.refresh()
+        return {
+            name: key_to_id[(asset_id, name)]
+            for name in names
+            if (asset_id, name) in key_to_id
+        }
+
+    def names_with_suffix(self, asset_id: int, suffix: str) -> List[str]:
+        def matching(key_to_id):
+            return [
+                name
+                for owner, name in key_to_id
+                if owner == asset_id and name.endswith(suffix)
+            ]
+
+        return sorted(matching(self.current()))
+
+
+signal_cache = SignalCache()
+
+
+def resolve_signal_names(
+    asset_id: int, signals: Optional[List[str]], resolution: Optional[str]
+) -> List[str]:
+    signals = list(dict.fromkeys(signals or []))
+    if resolution is None:
+        if not signals:
+            raise HTTPException(
+                status_code=400, detail="Provide signals and/or a resolution"
+            )
+        return signals
+
+    if resolution not in RESOLUTION_SUFFIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid resolution: {resolution}. Allowed: {list(RESOLUTION_SUFFIXES)}",
+        )
+    suffix = f"_{RESOLUTION_SUFFIXES[resolution]}"
+    if not signals:
+        return signal_cache.names_with_suffix(asset_id, suffix)
+    return [name if name.endswith(suffix) else f"{name}{suffix}" for name in signals]
+
+
+def build_measurements_query(
+    name_to_id: Dict[str, int], start: datetime, end: datetime
+):
+    # Pivoted in the database: one wide row per timestamp, one column per signal.
+    columns = [
+        func.max(Measurement.value)
+        .filter(Measurement.signal_id == signal_id)
+        .label(name)
+        for name, signal_id in name_to_id.items()
+    ]
+    return (
+        select(Measurement.timestamp, *columns)
+        .where(Measurement.signal_id.in_(list(name_to_id.values())))
+        .where(Measurement.timestamp >= start)
+        .where(Measurement.timestamp < end)
+        .group_by(Measurement.timestamp)
+        .order_by(Measurement.timestamp)
+    )
+
+
+def iter_target_rows(stmt, encoder):
+    with open_target_session() as session:
+        result = session.execute(
+            stmt, execution_options={"yield_per": STREAM_CHUNK_ROWS}
+        )
+        yield from iter_encoded(encoder, result.partitions())
+
+
+@router.get("/signals", response_model=List[str])
+def get_target_signals(
+    asset_id: int = Query(DEFAULT_ASSET_ID, description="Asset whose signals to list")
+):
+    return signal_cache.names(asset_id)
+
+
+@router.get("/measurements")
+def get_target_measurements(
+    start: datetime = Query(..., description="Start timestamp (inclusive)"),
+    end: datetime = Query(..., description="End timestamp (exclusive)"),
+    asset_id: int = Query(DEFAULT_ASSET_ID, description="Asset to read"),
+    signals: Optional[List[str]] = Query(
+        None,
+        description="Signal names; with a resolution, its suffix may be omitted",
+    ),
+    resolution: Optional[str] = Query(
+        None,
+        description=f"Signal family: {list(RESOLUTION_SUFFIXES)}. Without signals, returns the whole family",
+    ),
+    format: Optional[str] = Query(
+        None,
+        description=f"Output format: {OUTPUT_FORMATS}. Defaults to the Accept header, then json",
+    ),
+    accept: Optional[str] = Header(None),
+):
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    format = resolve_format(format, accept)
+    names = resolve_signal_names(asset_id, signals, resolution)
+
+    name_to_id = signal_cache.resolve(asset_id, names)
+    unknown = [name for name in names if name not in name_to_id]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown signals: {unknown}")
+    if not names:
+        raise HTTPException(status_code=404, detail="No signals for this resolution")
+
+    stmt = build_measurements_query(name_to_id, start, end)
+    encoder = TARGET_ENCODERS[format](["timestamp", *names])
+    return StreamingResponse(
+        stream_in_threadpool(iter_target_rows(stmt, encoder)),
+        media_type=encoder.media_type,
+    )
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+import pytest
+
+from api.blocks import BLOCK_VARIABLES, blocks_to_rows, split_into_blocks
+from api.serialization import ENCODERS, iter_encoded
+from api.source import (
+    DEFAULT_VARIABLES,
+    OUTPUT_FORMATS,
+    STREAM_CHUNK_ROWS,
+    DataQueryParams,
+    data_columns,
+    encode_data_json,
+)
+
+BLOCK_SIZE = timedelta(hours=1)
+
+
+@pytest.fixture(scope="session")
+def data_params(bench_size) -> DataQueryParams:
+    start, end = bench_size.window
+    return DataQueryParams(
+        start=start,
+        end=end,
+        variables=DEFAULT_VARIABLES,
+        asset_ids=list(range(1, bench_size.assets + 1)),
+    )
+
+
+@pytest.fixture(scope="session")
+def asset_blocks(bench_size, source_frame):
+    start, end = bench_size.window
+    n_blocks = (end - start) // BLOCK_SIZE
+    blocks = {}
+    for asset_id, frame in source_frame.groupby("asset_id"):
+        rows = list(
+            zip(
+                frame["timestamp"].tolist(),
+                *[frame[var].tolist() for var in BLOCK_VARIABLES],
+            )
+        )
+        blocks[asset_id] = split_into_blocks(rows, start, n_blocks, BLOCK_SIZE)
+    return blocks
+
+
+def rows_from_blocks(params: DataQueryParams, asset_blocks) -> list:
+    return [
+        row
+        for asset_id in params.asset_ids
+        for row in blocks_to_rows(
+            asset_blocks[asset_id],
+            params.start,
+            params.end,
+            params.variables,
+            asset_id if params.multi_asset else None,
+        )
+    ]
+
+
+@pytest.fixture(scope="session")
+def data_rows(data_params, asset_blocks) -> list:
+    return rows_from_blocks(data_params, asset_blocks)
+
+
+def test_blocks_to_rows(benchmark, bench_size, data_params, asset_blocks):
+    benchmark.group = "source_data_rows"
+    rows = benchmark(rows_from_blocks, data_params, asset_blocks)
+    assert len(rows) == bench_size.periods * bench_size.assets
+
+
+@pytest.mark.parametrize("format", OUTPUT_FORMATS)
+def test_source_data_serialization(
+    benchmark, bench_size, data_params, data_rows, format
+):
+    benchmark.group = f"source_data_{format}"
+    benchmark.extra_info["rows"] = len(data_rows)
+
+    def serialize() -> bytes:
+        if format == "json":
+            return encode_data_json(data_params, data_rows)
+        encoder = ENCODERS[format](data_columns(data_params))
+        chunks = (
+            data_rows[i : i + STREAM_CHUNK_ROWS]
+            for i in range(0, len(data_rows), STREAM_CHUNK_ROWS)
+        )
+        return b"".join(iter_encoded(encoder, chunks))
+
+    body = benchmark(serialize)
+    benchmark.extra_info["bytes"] = len(body)
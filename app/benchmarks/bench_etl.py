@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from db.source_setup import Asset, SourceData, ensure_assets
+from db.target_setup import (
+    Measurement,
+    ensure_asset_signals,
+    ensure_signals_and_seed_target,
+)
+from db.utils import (
+    build_measurement_frame_from_source_batch,
+    build_measurements_from_source_batch,
+    copy_dataframe,
+)
+from etl.etl_daily import SIGNAL_NAMES, aggregate_10min, write_target
+from .conftest import BENCH_DB_ROUNDS
+
+RAW_SIGNALS = ["wind_speed", "power", "ambient_temperature"]
+
+
+def test_aggregate_10min(benchmark, bench_size, asset_frames):
+    benchmark.group = "aggregate_10min"
+    benchmark.extra_info["source_rows"] = sum(map(len, asset_frames.values()))
+    result = benchmark(
+        lambda: [aggregate_10min(frame) for frame in asset_frames.values()]
+    )
+    assert len(result) == bench_size.assets
+
+
+def test_build_measurements_from_source_batch(benchmark, bench_size, source_rows):
+    benchmark.group = "build_measurements"
+    benchmark.extra_info["source_rows"] = len(source_rows)
+    name_to_signal = {
+        name: SimpleNamespace(id=i) for i, name in enumerate(RAW_SIGNALS, 1)
+    }
+    result = benchmark.pedantic(
+        build_measurements_from_source_batch,
+        args=(source_rows, name_to_signal, Measurement),
+        rounds=BENCH_DB_ROUNDS,
+    )
+    assert len(result) == 3 * len(source_rows)
+
+
+def test_build_measurement_frame_from_source_batch(benchmark, bench_size, source_rows):
+    benchmark.group = "build_measurements"
+    benchmark.extra_info["source_rows"] = len(source_rows)
+    name_to_id = {
+        asset_id: {name: i for i, name in enumerate(RAW_SIGNALS, 1)}
+        for asset_id in range(1, bench_size.assets + 1)
+    }
+    result = benchmark(
+        build_measurement_frame_from_source_batch, source_rows, name_to_id, RAW_SIGNALS
+    )
+    assert len(result) == 3 * len(source_rows)
+
+
+@pytest.mark.parametrize("mode", ["replace", "upsert"])
+def test_write_target(benchmark, bench_size, bench_engines, agg_frames, mode):
+    _, tgt_engine = bench_engines
+    start, end = bench_size.window
+    with Session(tgt_engine) as session:
+        ensure_asset_signals(session, SIGNAL_NAMES, list(agg_frames))
+    benchmark.group = "write_target"
+    benchmark.extra_info["agg_rows"] = sum(map(len, agg_frames.values()))
+
+    def write_all():
+        return sum(
+            write_target(tgt_engine, agg, start, end, mode, asset_id=asset_id)
+            for asset_id, agg in agg_frames.items()
+        )
+
+    benchmark.pedantic(write_all, rounds=BENCH_DB_ROUNDS, warmup_rounds=1)
+
+
+@pytest.fixture(scope="session")
+def seeded_source(bench_engines, source_frame):
+    src_engine, _ = bench_engines
+    with src_engine.begin() as conn:
+        conn.execute(
+            text(f'TRUNCATE "{SourceData.__tablename__}", "{Asset.__tablename__}"')
+        )
+        ensure_assets(conn, sorted(source_frame["asset_id"].unique().tolist()))
+        copy_dataframe(conn, SourceData.__tablename__, source_frame)
+    return bench_engines
+
+
+def test_ensure_signals_and_seed_target(benchmark, bench_size, seeded_source):
+    src_engine, tgt_engine = seeded_source
+    benchmark.group = "seed_target"
+    benchmark.extra_info["source_rows"] = bench_size.periods * bench_size.assets
+
+    def clear_target():
+        with tgt_engine.begin() as conn:
+            conn.execute(text(f'TRUNCATE "{Measurement.__tablename__}"'))
+
+    inserted = benchmark.pedantic(
+        ensure_signals_and_seed_target,
+        args=(tgt_engine, src_engine),
+        setup=clear_target,
+        rounds=BENCH_DB_ROUNDS,
+    )
+    assert inserted == 3 * bench_size.periods * bench_size.assets
@@ -0,0 +1,135 @@
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from db.source_setup import create_source_schema, iter_source_frames
+from db.target_setup import create_target_schema
+from etl.etl_daily import REQUEST_VARS, aggregate_10min
+
+
+class BenchSize(NamedTuple):
+    name: str
+    days: int
+    assets: int
+
+    @property
+    def periods(self) -> int:
+        return self.days * 24 * 60
+
+    @property
+    def window(self):
+        return BENCH_START, BENCH_START + timedelta(days=self.days)
+
+
+BENCH_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+BENCH_SEED = 42
+BENCH_FLEET_ASSETS = int(os.getenv("BENCH_FLEET_ASSETS", "100"))
+BENCH_SIZES = {
+    "1d": BenchSize("1d", 1, 1),
+    "30d": BenchSize("30d", 30, 1),
+    "1y": BenchSize("1y", 365, 1),
+    "fleet": BenchSize("fleet", 1, BENCH_FLEET_ASSETS),
+}
+BENCH_SELECTED = [
+    name.strip()
+    for name in (os.getenv("BENCH_SIZES") or ",".join(BENCH_SIZES)).split(",")
+    if name.strip()
+]
+BENCH_DB_URL = os.getenv("BENCH_DB_URL")
+BENCH_DB_ROUNDS = int(os.getenv("BENCH_DB_ROUNDS", "3"))
+BENCH_SOURCE_DB = "bench_source"
+BENCH_TARGET_DB = "bench_target"
+
+
+@pytest.fixture(scope="session", params=BENCH_SELECTED)
+def bench_size(request) -> BenchSize:
+    if request.param not in BENCH_SIZES:
+        pytest.fail(f"Unknown BENCH_SIZES entry: {request.param}")
+    return BENCH_SIZES[request.param]
+
+
+@pytest.fixture(scope="session")
+def source_frame(bench_size: BenchSize) -> pd.DataFrame:
+    frames = iter_source_frames(
+        BENCH_START,
+        bench_size.periods,
+        BENCH_SEED,
+        asset_ids=range(1, bench_size.assets + 1),
+    )
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture(scope="session")
+def asset_frames(source_frame: pd.DataFrame) -> Dict[int, pd.DataFrame]:
+    # What the ETL holds for one (day range, asset) task after fetching it.
+    return {
+        asset_id: frame.set_index("timestamp")[REQUEST_VARS]
+        for asset_id, frame in source_frame.groupby("asset_id")
+    }
+
+
+@pytest.fixture(scope="session")
+def agg_frames(asset_frames: Dict[int, pd.DataFrame]) -> Dict[int, pd.DataFrame]:
+    return {
+        asset_id: aggregate_10min(frame) for asset_id, frame in asset_frames.items()
+    }
+
+
+@pytest.fixture(scope="session")
+def source_rows(source_frame: pd.DataFrame) -> List[tuple]:
+    return list(
+        source_frame[
+            ["asset_id", "timestamp", "wind_speed", "power", "ambient_temperature"]
+        ].itertuples(index=False, name="SourceRow")
+    )
+
+
+def start_local_postgres() -> Iterator[str]:
+    # Embedded Postgres in a throwaway directory; stopped when the session ends.
+    try:
+        import pgserver
+    except ImportError:
+        pytest.skip("Set BENCH_DB_URL or install pgserver for database benchmarks")
+    with tempfile.TemporaryDirectory(prefix="bench-pg-") as pgdata:
+        server = pgserver.get_server(pgdata, cleanup_mode="stop")
+        try:
+            yield server.get_uri("postgres")
+        finally:
+            server.cleanup()
+
+
+@pytest.fixture(scope="session")
+def postgres_url() -> Iterator[str]:
+    if BENCH_DB_URL:
+        yield BENCH_DB_URL
+        return
+    yield from start_local_postgres()
+
+
+def recreate_database(server_url: str, db_name: str) -> str:
+    engine = create_engine(server_url, poolclass=NullPool, isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{db_name}" WITH (FORCE)'))
+        conn.execute(text(f'CREATE DATABASE "{db_name}"'))
+    engine.dispose()
+    return (
+        make_url(server_url).set(database=db_name).render_as_string(hide_password=False)
+    )
+
+
+@pytest.fixture(scope="session")
+def bench_engines(postgres_url: str):
+    src_engine = create_engine(recreate_database(postgres_url, BENCH_SOURCE_DB))
+    tgt_engine = create_engine(recreate_database(postgres_url, BENCH_TARGET_DB))
+    create_source_schema(src_engine)
+    create_target_schema(tgt_engine)
+    yield src_engine, tgt_engine
+    src_engine.dispose()
+    tgt_engine.dispose()
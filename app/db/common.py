@@ -1,6 +1,12 @@
 import os
+import threading
 import time
-from sqlalchemy import create_engine, text
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 
 DB_HOST = os.getenv("DB_HOST", "postgres")
@@ -13,6 +19,12 @@ DB_TARGET_NAME = os.getenv("DB_TARGET_NAME", "target")
 CONNECTION_ATTEMPTS_DEFAULT = int(os.getenv("DB_CONN_ATTEMPTS", "30"))
 CONNECTION_DELAY_S_DEFAULT = float(os.getenv("DB_CONN_DELAY_S", "1.0"))
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
 
 def build_db_url(db_name: str) -> str:
     return (
@@ -20,29 +32,175 @@ def build_db_url(db_name: str) -> str:
     )
 
 
+def build_async_db_url(db_name: str) -> str:
+    return f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{db_name}"
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "timeouts": self.timeouts,
+            }
+
+
+class _InstrumentedPoolMixin:
+    stats: PoolStats
+
+    def connect(self):
+        # Time spent getting a connection: waiting for a free one, or opening it.
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.stats.incr("timeouts")
+            raise
+        finally:
+            self.stats.incr("wait_seconds", time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# One engine per (database, kind, pool size): callers that need a bigger pool,
+# such as the ETL with its --workers, get their own engine instead of resizing
+# one that is already shared.
+_engines: Dict[Tuple[str, str, int], object] = {}
+_engines_lock = threading.Lock()
+
+
+def _pool_kwargs(pool_size: int) -> dict:
+    return {
+        "pool_pre_ping": True,
+        "pool_size": pool_size,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_S,
+        "pool_recycle": DB_POOL_RECYCLE_S,
+    }
+
+
+def _attach_pool_stats(engine, pool) -> None:
+    pool.stats = PoolStats()
+    stats = pool.stats
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "connect", lambda *_: stats.incr("connects"))
+    event.listen(sync_engine, "checkout", lambda *_: stats.incr("checkouts"))
+    event.listen(sync_engine, "checkin", lambda *_: stats.incr("checkins"))
+
+
+def get_engine(db_name: str, pool_size: Optional[int] = None):
+    pool_size = pool_size or DB_POOL_SIZE
+    key = (db_name, "sync", pool_size)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            return engine
+        connect_args = {}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+        engine = create_engine(
+            build_db_url(db_name),
+            poolclass=InstrumentedQueuePool,
+            connect_args=connect_args,
+            **_pool_kwargs(pool_size),
+        )
+        _attach_pool_stats(engine, engine.pool)
+        _engines[key] = engine
+        return engine
+
+
+def get_async_engine(db_name: str, pool_size: Optional[int] = None) -> AsyncEngine:
+    pool_size = pool_size or DB_POOL_SIZE
+    key = (db_name, "async", pool_size)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            return engine
+        connect_args = {}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)
+            }
+        engine = create_async_engine(
+            build_async_db_url(db_name),
+            poolclass=InstrumentedAsyncQueuePool,
+            connect_args=connect_args,
+            **_pool_kwargs(pool_size),
+        )
+        _attach_pool_stats(engine, engine.sync_engine.pool)
+        _engines[key] = engine
+        return engine
+
+
+def pool_status() -> Dict[str, dict]:
+    with _engines_lock:
+        engines = dict(_engines)
+    status = {}
+    for (db_name, kind, pool_size), engine in engines.items():
+        pool = getattr(engine, "sync_engine", engine).pool
+        status[f"{db_name}:{kind}:{pool_size}"] = {
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "status": pool.status(),
+            **pool.stats.as_dict(),
+        }
+    return status
+
+
 def wait_for_connection(
     url: str,
     attempts: int = CONNECTION_ATTEMPTS_DEFAULT,
     delay_s: float = CONNECTION_DELAY_S_DEFAULT,
 ) -> None:
     last_error = None
-    for _ in range(attempts):
-        try:
-            engine = create_engine(url, pool_pre_ping=True)
-            with engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-            engine.dispose()
-            return
-        except Exception as exc:  # noqa: BLE001
-            last_error = exc
-            time.sleep(delay_s)
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        for _ in range(attempts):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                return
+            except Exception as exc:  # noqa: BLE001
+                last_error = exc
+                time.sleep(delay_s)
+    finally:
+        engine.dispose()
     raise RuntimeError(f"Could not connect to {url}: {last_error}")
 
 
 def create_database_if_not_exists(db_name: str) -> None:
     server_url = build_db_url("postgres")
     wait_for_connection(server_url)
-    engine = create_engine(server_url, pool_pre_ping=True, isolation_level="AUTOCOMMIT")
+    engine = create_engine(server_url, poolclass=NullPool, isolation_level="AUTOCOMMIT")
     with engine.connect() as conn:
         exists = conn.execute(
             text("SELECT 1 FROM pg_database WHERE datname = :name"),
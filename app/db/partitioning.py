@@ -0,0 +1,189 @@
+import argparse
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Table, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from . import common
+
+
+PARTITION_GRANULARITIES = ["month", "day"]
+DB_PARTITION_BY = os.getenv("DB_PARTITION_BY") or None
+PARTITION_COMMENT_PREFIX = "partition_by="
+PARTITION_SUFFIX_FORMATS = {"month": "%Y%m", "day": "%Y%m%d"}
+
+
+def validate_granularity(granularity: str) -> str:
+    if granularity not in PARTITION_GRANULARITIES:
+        raise ValueError(
+            f"Invalid partition granularity: {granularity}. "
+            f"Allowed: {PARTITION_GRANULARITIES}"
+        )
+    return granularity
+
+
+def partition_bounds(ts: datetime, granularity: str) -> Tuple[datetime, datetime]:
+    ts = ts.astimezone(timezone.utc)
+    if granularity == "day":
+        lower = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+        return lower, lower + timedelta(days=1)
+    lower = ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if lower.month == 12:
+        return lower, lower.replace(year=lower.year + 1, month=1)
+    return lower, lower.replace(month=lower.month + 1)
+
+
+def partition_name(table_name: str, lower: datetime, granularity: str) -> str:
+    return f"{table_name}_p{lower.strftime(PARTITION_SUFFIX_FORMATS[granularity])}"
+
+
+def create_partitioned_table(engine, table: Table, granularity: str) -> None:
+    validate_granularity(granularity)
+    ddl = str(CreateTable(table).compile(dialect=postgresql.dialect())).rstrip()
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": table.name}
+        ).scalar()
+        if exists:
+            return
+        conn.execute(text(f"{ddl} PARTITION BY RANGE (timestamp)"))
+        conn.execute(
+            text(
+                f'COMMENT ON TABLE "{table.name}" IS '
+                f"'{PARTITION_COMMENT_PREFIX}{granularity}'"
+            )
+        )
+
+
+def ensure_brin_index(engine, table_name: str, column_name: str = "timestamp") -> None:
+    # CREATE INDEX IF NOT EXISTS still takes a SHARE lock on the table, which
+    # waits for (and blocks) open writes; only issue it when the index is missing.
+    index_name = f"ix_{table_name}_{column_name}_brin"
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": index_name}
+        ).scalar()
+        if not exists:
+            conn.execute(
+                text(
+                    f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+                    f'ON "{table_name}" USING brin ("{column_name}")'
+                )
+            )
+
+
+def get_partition_granularity(conn, table_name: str) -> Optional[str]:
+    comment = conn.execute(
+        text(
+            "SELECT obj_description(c.oid, 'pg_class') FROM pg_class c "
+            "JOIN pg_partitioned_table p ON p.partrelid = c.oid "
+            "WHERE c.oid = to_regclass(:name)"
+        ),
+        {"name": table_name},
+    ).scalar()
+    if not comment or not comment.startswith(PARTITION_COMMENT_PREFIX):
+        return None
+    return comment[len(PARTITION_COMMENT_PREFIX) :]
+
+
+def list_partitions(conn, table_name: str) -> List[str]:
+    return list(
+        conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:name)"
+            ),
+            {"name": table_name},
+        ).scalars()
+    )
+
+
+def ensure_partitions(engine, table_name: str, start: datetime, end: datetime) -> int:
+    # Runs in its own short transaction: creating a partition locks the parent,
+    # so it must not happen inside a transaction that is writing to it.
+    with engine.connect() as conn:
+        granularity = get_partition_granularity(conn, table_name)
+        if granularity is None or start >= end:
+            return 0
+        existing = set(list_partitions(conn, table_name))
+
+    wanted = []
+    lower, upper = partition_bounds(start, granularity)
+    while lower < end:
+        name = partition_name(table_name, lower, granularity)
+        if name not in existing:
+            wanted.append((name, lower, upper))
+        lower, upper = partition_bounds(upper, granularity)
+    if not wanted:
+        return 0
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": table_name}
+        )
+        for name, lower, upper in wanted:
+            conn.execute(
+                text(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table_name}" '
+                    f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                )
+            )
+    return len(wanted)
+
+
+def drop_partitions_before(engine, table_name: str, cutoff: datetime) -> List[str]:
+    pattern = re.compile(rf"^{re.escape(table_name)}_p(\d{{6}}|\d{{8}})$")
+    dropped = []
+    with engine.begin() as conn:
+        granularity = get_partition_granularity(conn, table_name)
+        if granularity is None:
+            return dropped
+        for name in sorted(list_partitions(conn, table_name)):
+            match = pattern.match(name)
+            if not match:
+                continue
+            lower = datetime.strptime(
+                match.group(1), PARTITION_SUFFIX_FORMATS[granularity]
+            ).replace(tzinfo=timezone.utc)
+            _, upper = partition_bounds(lower, granularity)
+            if upper <= cutoff:
+                conn.execute(
+                    text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{name}"')
+                )
+                conn.execute(text(f'DROP TABLE "{name}"'))
+                dropped.append(name)
+    return dropped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Remove partições de dados anteriores a uma data"
+    )
+    parser.add_argument(
+        "--db",
+        choices=["source", "target"],
+        required=True,
+        help="Banco cujas partições serão removidas",
+    )
+    parser.add_argument(
+        "--drop-before",
+        required=True,
+        help="Remove partições que terminam até esta data (YYYY-MM-DD, UTC)",
+    )
+    args = parser.parse_args()
+
+    db_name = common.DB_SOURCE_NAME if args.db == "source" else common.DB_TARGET_NAME
+    cutoff = datetime.strptime(args.drop_before, "%Y-%m-%d").replace(
+        tzinfo=timezone.utc
+    )
+    dropped = drop_partitions_before(common.get_engine(db_name), "data", cutoff)
+    print(f"Dropped partitions: {', '.join(dropped) if dropped else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
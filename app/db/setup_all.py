@@ -1,5 +1,4 @@
 import sys
-from sqlalchemy import create_engine
 
 from . import common
 from .source_setup import create_source_schema, seed_source_data
@@ -12,11 +11,11 @@ def main() -> None:
 
     src_url = common.build_db_url(common.DB_SOURCE_NAME)
     common.wait_for_connection(src_url)
-    src_engine = create_engine(src_url, pool_pre_ping=True)
+    src_engine = common.get_engine(common.DB_SOURCE_NAME)
 
     tgt_url = common.build_db_url(common.DB_TARGET_NAME)
     common.wait_for_connection(tgt_url)
-    tgt_engine = create_engine(tgt_url, pool_pre_ping=True)
+    tgt_engine = common.get_engine(common.DB_TARGET_NAME)
 
     create_source_schema(src_engine)
     create_target_schema(tgt_engine)
@@ -27,7 +26,10 @@ def main() -> None:
     print("Source DB:")
     print(f"  database: {common.DB_SOURCE_NAME}")
     print(f"  period: {start_ts.isoformat()} -> {end_ts.isoformat()}")
-    print(f"  rows: {num_rows}")
+    if num_rows:
+        print(f"  rows: {num_rows}")
+    else:
+        print("  rows not inserted (already present)")
     print("Target DB:")
     print(f"  database: {common.DB_TARGET_NAME}")
     if inserted:
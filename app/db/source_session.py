@@ -1,6 +1,6 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, Session
 
 from . import common
@@ -8,6 +8,8 @@ from . import common
 
 _source_engine = None
 _SourceSessionLocal = None
+_async_source_engine = None
+_AsyncSourceSessionLocal = None
 
 
 def _ensure_source_session_factory() -> None:
@@ -16,12 +18,17 @@ def _ensure_source_session_factory() -> None:
         return
     url = common.build_db_url(common.DB_SOURCE_NAME)
     common.wait_for_connection(url)
-    _source_engine = create_engine(url, pool_pre_ping=True)
+    _source_engine = common.get_engine(common.DB_SOURCE_NAME)
     _SourceSessionLocal = sessionmaker(
         autocommit=False, autoflush=False, bind=_source_engine
     )
 
 
+def open_source_session() -> Session:
+    _ensure_source_session_factory()
+    return _SourceSessionLocal()
+
+
 def get_source_session() -> Generator[Session, None, None]:
     _ensure_source_session_factory()
     session: Session = _SourceSessionLocal()
@@ -29,3 +36,23 @@ def get_source_session() -> Generator[Session, None, None]:
         yield session
     finally:
         session.close()
+
+
+def _ensure_async_source_session_factory() -> None:
+    global _async_source_engine, _AsyncSourceSessionLocal
+    if _AsyncSourceSessionLocal is not None:
+        return
+    _async_source_engine = common.get_async_engine(common.DB_SOURCE_NAME)
+    _AsyncSourceSessionLocal = async_sessionmaker(
+        bind=_async_source_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+def open_async_source_session() -> AsyncSession:
+    _ensure_async_source_session_factory()
+    return _AsyncSourceSessionLocal()
+
+
+async def get_async_source_session() -> AsyncGenerator[AsyncSession, None]:
+    async with open_async_source_session() as session:
+        yield session
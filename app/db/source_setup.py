@@ -1,9 +1,29 @@
-import random
+import os
 from datetime import datetime, timedelta, timezone
-from typing import List, Tuple
-
-from sqlalchemy import Column, DateTime, Float
-from sqlalchemy.orm import declarative_base, Session
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    String,
+    exists,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import declarative_base
+
+from .partitioning import (
+    DB_PARTITION_BY,
+    create_partitioned_table,
+    ensure_brin_index,
+    ensure_partitions,
+)
+from .utils import copy_dataframe
 
 MEAN_WIND_SPEED = 8.0
 WIND_SPEED_STD_DEV = 3.0
@@ -17,68 +37,137 @@ WIND_POWER_FACTOR = 1.5
 MIN_POWER = 0.0
 POWER_VARIATION_FACTOR = 0.05
 
+SEED_DAYS_DEFAULT = float(os.getenv("SOURCE_SEED_DAYS", "10"))
+SEED_ASSETS_DEFAULT = int(os.getenv("SOURCE_SEED_ASSETS", "1"))
+DEFAULT_ASSET_ID = 1
+SEED_RANDOM_STATE = os.getenv("SOURCE_SEED")
+GENERATION_CHUNK_ROWS = int(os.getenv("SOURCE_GENERATION_CHUNK_ROWS", "100000"))
+
 
 BaseSource = declarative_base()
 
 
+class Asset(BaseSource):
+    __tablename__ = "asset"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(64), unique=True, nullable=False)
+
+
 class SourceData(BaseSource):
     __tablename__ = "data"
 
+    # (asset_id, timestamp): one asset's window is a single index range scan.
+    asset_id = Column(Integer, primary_key=True, server_default=str(DEFAULT_ASSET_ID))
     timestamp = Column(DateTime(timezone=True), primary_key=True)
     wind_speed = Column(Float, nullable=False)
     power = Column(Float, nullable=False)
     ambient_temperature = Column(Float, nullable=False)
 
 
-def create_source_schema(engine) -> None:
+def create_source_schema(engine, partition_by: Optional[str] = DB_PARTITION_BY) -> None:
+    if partition_by:
+        BaseSource.metadata.create_all(engine, tables=[Asset.__table__])
+        create_partitioned_table(engine, SourceData.__table__, partition_by)
     BaseSource.metadata.create_all(engine)
+    ensure_brin_index(engine, SourceData.__tablename__)
+
+
+def asset_name(asset_id: int) -> str:
+    return f"turbine-{asset_id:03d}"
+
+
+def ensure_assets(conn, asset_ids: Sequence[int]) -> None:
+    stmt = pg_insert(Asset).values(
+        [{"id": asset_id, "name": asset_name(asset_id)} for asset_id in asset_ids]
+    )
+    conn.execute(stmt.on_conflict_do_nothing(index_elements=[Asset.id]))
+
+
+def generate_source_frame(
+    start_ts: datetime,
+    periods: int,
+    rng: np.random.Generator,
+    asset_id: int = DEFAULT_ASSET_ID,
+) -> pd.DataFrame:
+    timestamps = pd.date_range(start_ts, periods=periods, freq="1min")
+    wind_speed = np.maximum(
+        MIN_WIND_SPEED, rng.normal(MEAN_WIND_SPEED, WIND_SPEED_STD_DEV, periods)
+    )
+    ambient_temperature = rng.uniform(MIN_AMBIENT_TEMP, MAX_AMBIENT_TEMP, periods)
+    base_power = np.minimum(MAX_POWER, (wind_speed**3) * WIND_POWER_FACTOR)
+    power = np.maximum(
+        MIN_POWER, rng.normal(base_power, base_power * POWER_VARIATION_FACTOR)
+    )
+    return pd.DataFrame(
+        {
+            "asset_id": asset_id,
+            "timestamp": timestamps,
+            "wind_speed": wind_speed,
+            "power": power,
+            "ambient_temperature": ambient_temperature,
+        }
+    )
+
+
+def iter_source_frames(
+    start_ts: datetime,
+    periods: int,
+    seed: Optional[int] = None,
+    chunk_rows: int = GENERATION_CHUNK_ROWS,
+    asset_ids: Sequence[int] = (DEFAULT_ASSET_ID,),
+) -> Iterator[pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    for asset_id in asset_ids:
+        for offset in range(0, periods, chunk_rows):
+            yield generate_source_frame(
+                start_ts + timedelta(minutes=offset),
+                min(chunk_rows, periods - offset),
+                rng,
+                asset_id,
+            )
+
 
+def seeded_range_query():
+    # Per-asset min/max are read from the (asset_id, timestamp) primary key;
+    # a global min/max over data would scan every row.
+    def bound(agg):
+        return (
+            select(agg(SourceData.timestamp))
+            .where(SourceData.asset_id == Asset.id)
+            .correlate(Asset)
+            .scalar_subquery()
+        )
+
+    return select(func.min(bound(func.min)), func.max(bound(func.max))).select_from(
+        Asset
+    )
 
-def generate_source_data(start_ts: datetime, end_ts: datetime) -> List[SourceData]:
-    minute = timedelta(minutes=1)
-    timestamps = []
-    curr = start_ts
-    while curr < end_ts:
-        timestamps.append(curr)
-        curr += minute
-    return timestamps
 
+def seed_source_data(
+    engine,
+    days: float = SEED_DAYS_DEFAULT,
+    seed: Optional[int] = None,
+    assets: int = SEED_ASSETS_DEFAULT,
+) -> Tuple[datetime, datetime, int]:
+    if seed is None and SEED_RANDOM_STATE is not None:
+        seed = int(SEED_RANDOM_STATE)
+
+    with engine.connect() as conn:
+        if conn.execute(select(exists().select_from(SourceData))).scalar():
+            first_ts, last_ts = conn.execute(seeded_range_query()).one()
+            return first_ts, last_ts + timedelta(minutes=1), 0
 
-def seed_source_data(engine) -> Tuple[datetime, datetime, int]:
     now_utc = datetime.now(timezone.utc)
     end_ts = now_utc.replace(second=0, microsecond=0)
-    start_ts = end_ts - timedelta(days=10)
-
-    minute = timedelta(minutes=1)
-    timestamps = []
-    curr = start_ts
-    while curr < end_ts:
-        timestamps.append(curr)
-        curr += minute
-
-    rows = []
-    for ts in timestamps:
-        wind_speed = max(
-            MIN_WIND_SPEED, random.gauss(MEAN_WIND_SPEED, WIND_SPEED_STD_DEV)
-        )
-        ambient_temperature = random.uniform(MIN_AMBIENT_TEMP, MAX_AMBIENT_TEMP)
-        base_power = min(MAX_POWER, (wind_speed**3) * WIND_POWER_FACTOR)
-        power = max(
-            MIN_POWER, random.gauss(base_power, base_power * POWER_VARIATION_FACTOR)
-        )
-        rows.append(
-            SourceData(
-                timestamp=ts,
-                wind_speed=float(wind_speed),
-                power=float(power),
-                ambient_temperature=float(ambient_temperature),
-            )
-        )
+    periods = int(days * 24 * 60)
+    start_ts = end_ts - timedelta(minutes=periods)
+    asset_ids = list(range(DEFAULT_ASSET_ID, DEFAULT_ASSET_ID + max(assets, 1)))
 
-    with Session(engine) as session:
-        existing = session.query(SourceData).limit(1).first()
-        if not existing:
-            session.bulk_save_objects(rows)
-            session.commit()
+    ensure_partitions(engine, SourceData.__tablename__, start_ts, end_ts)
+    with engine.begin() as conn:
+        ensure_assets(conn, asset_ids)
+        for frame in iter_source_frames(start_ts, periods, seed, asset_ids=asset_ids):
+            copy_dataframe(conn, SourceData.__tablename__, frame)
 
-    return start_ts, end_ts, len(timestamps)
+    return start_ts, end_ts, periods * len(asset_ids)
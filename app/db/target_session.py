@@ -0,0 +1,24 @@
+from sqlalchemy.orm import sessionmaker, Session
+
+from . import common
+
+
+_target_engine = None
+_TargetSessionLocal = None
+
+
+def _ensure_target_session_factory() -> None:
+    global _target_engine, _TargetSessionLocal
+    if _TargetSessionLocal is not None:
+        return
+    url = common.build_db_url(common.DB_TARGET_NAME)
+    common.wait_for_connection(url)
+    _target_engine = common.get_engine(common.DB_TARGET_NAME)
+    _TargetSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=_target_engine
+    )
+
+
+def open_target_session() -> Session:
+    _ensure_target_session_factory()
+    return _TargetSessionLocal()
@@ -1,10 +1,36 @@
-from typing import List
-
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+import os
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import declarative_base, relationship, Session
 
-from .source_setup import SourceData
-from .utils import build_measurements_from_source_batch
+from .partitioning import (
+    DB_PARTITION_BY,
+    create_partitioned_table,
+    ensure_brin_index,
+    ensure_partitions,
+    get_partition_granularity,
+)
+from .source_setup import DEFAULT_ASSET_ID, Asset, SourceData, seeded_range_query
+from .utils import build_measurement_frame_from_source_batch, copy_dataframe
+
+SEED_CHUNK_ROWS = int(os.getenv("TARGET_SEED_CHUNK_ROWS", "50000"))
+# Aggregated signals are named {var}_{stat}_{suffix}, one family per resolution.
+RESOLUTION_SUFFIXES = {"10min": "10m", "1h": "1h", "1d": "1d"}
 
 
 BaseTarget = declarative_base()
@@ -12,9 +38,12 @@ BaseTarget = declarative_base()
 
 class Signal(BaseTarget):
     __tablename__ = "signal"
+    __table_args__ = (UniqueConstraint("asset_id", "name"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(64), unique=True, nullable=False)
+    # Every asset has its own signals, so measurements stay (timestamp, signal_id).
+    asset_id = Column(Integer, nullable=False, server_default=str(DEFAULT_ASSET_ID))
+    name = Column(String(64), nullable=False)
     data = relationship(
         "Measurement", back_populates="signal", cascade="all, delete-orphan"
     )
@@ -30,45 +59,136 @@ class Measurement(BaseTarget):
     signal = relationship("Signal", back_populates="data")
 
 
-def create_target_schema(engine) -> None:
+class Watermark(BaseTarget):
+    __tablename__ = "etl_watermark"
+
+    signal_id = Column(Integer, ForeignKey("signal.id"), primary_key=True)
+    last_timestamp = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class EtlRun(BaseTarget):
+    __tablename__ = "etl_run"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    mode = Column(String(16), nullable=False)
+    asset_id = Column(Integer, nullable=False)
+    window_start = Column(DateTime(timezone=True))
+    window_end = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(16), nullable=False)
+    error = Column(Text)
+    source_rows = Column(Integer)
+    agg_rows = Column(Integer)
+    inserted = Column(Integer)
+    duration_s = Column(Float, nullable=False)
+    # {stage: {seconds, rows, rows_per_s, bytes, peak_traced_bytes, max_rss_bytes}}
+    stages = Column(JSONB, nullable=False)
+
+
+def create_target_schema(engine, partition_by: Optional[str] = DB_PARTITION_BY) -> None:
+    if partition_by:
+        BaseTarget.metadata.create_all(engine, tables=[Signal.__table__])
+        create_partitioned_table(engine, Measurement.__table__, partition_by)
     BaseTarget.metadata.create_all(engine)
+    ensure_brin_index(engine, Measurement.__tablename__)
+
+
+def iter_source_batches(
+    engine_source, chunk_rows: int = SEED_CHUNK_ROWS
+) -> Iterator[List[Row]]:
+    # Keyset pagination: every page is an index range scan, whatever its depth.
+    last_key = None
+    key = tuple_(SourceData.asset_id, SourceData.timestamp)
+    with engine_source.connect() as conn:
+        while True:
+            stmt = (
+                select(
+                    SourceData.asset_id,
+                    SourceData.timestamp,
+                    SourceData.wind_speed,
+                    SourceData.power,
+                    SourceData.ambient_temperature,
+                )
+                .order_by(SourceData.asset_id, SourceData.timestamp)
+                .limit(chunk_rows)
+            )
+            if last_key is not None:
+                stmt = stmt.where(key > tuple_(*last_key))
+            batch = conn.execute(stmt).all()
+            if not batch:
+                return
+            yield batch
+            last_key = (batch[-1].asset_id, batch[-1].timestamp)
+
+
+def ensure_asset_signals(
+    session: Session, signal_names: List[str], asset_ids: Sequence[int]
+) -> Dict[int, Dict[str, int]]:
+    def load() -> Dict[int, Dict[str, int]]:
+        rows = session.execute(
+            select(Signal.asset_id, Signal.name, Signal.id)
+            .where(Signal.asset_id.in_(asset_ids))
+            .where(Signal.name.in_(signal_names))
+        ).all()
+        ids = {asset_id: {} for asset_id in asset_ids}
+        for asset_id, name, signal_id in rows:
+            ids[asset_id][name] = signal_id
+        return ids
+
+    ids = load()
+    missing = [
+        Signal(asset_id=asset_id, name=name)
+        for asset_id in asset_ids
+        for name in signal_names
+        if name not in ids[asset_id]
+    ]
+    if missing:
+        session.add_all(missing)
+        session.commit()
+        ids = load()
+    return ids
 
 
 def ensure_signals_and_seed_target(engine_target, engine_source) -> int:
     signal_names = ["wind_speed", "power", "ambient_temperature"]
+    with engine_source.connect() as conn_src:
+        asset_ids = list(
+            conn_src.execute(select(Asset.id).order_by(Asset.id)).scalars()
+        )
     with Session(engine_target) as session_tgt:
-        name_to_signal = {s.name: s for s in session_tgt.query(Signal).all()}
-        to_create = [Signal(name=n) for n in signal_names if n not in name_to_signal]
-        if to_create:
-            session_tgt.add_all(to_create)
-            session_tgt.commit()
-        name_to_signal = {s.name: s for s in session_tgt.query(Signal).all()}
+        name_to_id = ensure_asset_signals(
+            session_tgt, signal_names, asset_ids or [DEFAULT_ASSET_ID]
+        )
 
         has_data = session_tgt.query(Measurement).limit(1).first() is not None
         if has_data:
             return 0
 
-        inserted = 0
-        with Session(engine_source) as session_src:
-            for chunk_start in range(0, 1_000_000_000):
-                batch: List[SourceData] = (
-                    session_src.query(SourceData)
-                    .order_by(SourceData.timestamp)
-                    .offset(chunk_start * 5000)
-                    .limit(5000)
-                    .all()
-                )
-                if not batch:
-                    break
-
-                measurements: list[Measurement] = build_measurements_from_source_batch(
-                    batch=batch,
-                    name_to_signal=name_to_signal,
-                    measurement_cls=Measurement,
-                )
-
-                session_tgt.bulk_save_objects(measurements)
-                session_tgt.commit()
-                inserted += len(measurements)
-
-        return inserted
+    with engine_target.connect() as conn_tgt:
+        partitioned = (
+            get_partition_granularity(conn_tgt, Measurement.__tablename__) is not None
+        )
+    if partitioned:
+        with engine_source.connect() as conn_src:
+            first_ts, last_ts = conn_src.execute(seeded_range_query()).one()
+        if first_ts is not None:
+            ensure_partitions(
+                engine_target,
+                Measurement.__tablename__,
+                first_ts,
+                last_ts + timedelta(minutes=1),
+            )
+
+    inserted = 0
+    with engine_target.begin() as conn_tgt:
+        for batch in iter_source_batches(engine_source):
+            measurements = build_measurement_frame_from_source_batch(
+                batch, name_to_id, signal_names
+            )
+            inserted += copy_dataframe(
+                conn_tgt, Measurement.__tablename__, measurements
+            )
+
+    return inserted
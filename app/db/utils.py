@@ -1,5 +1,8 @@
+import io
 from typing import Iterable, List, Mapping, Any
 
+import pandas as pd
+
 
 def build_measurements_from_source_batch(
     batch: Iterable[Any],
@@ -30,3 +33,38 @@ def build_measurements_from_source_batch(
             )
         )
     return measurements
+
+
+def build_measurement_frame_from_source_batch(
+    batch: Iterable[Any],
+    name_to_id: Mapping[int, Mapping[str, int]],
+    signal_names: List[str],
+) -> pd.DataFrame:
+    wide = pd.DataFrame(list(batch), columns=["asset_id", "timestamp", *signal_names])
+    long_df = wide.melt(
+        id_vars=["asset_id", "timestamp"], var_name="signal_name", value_name="value"
+    )
+    ids = pd.Series(
+        {
+            (asset_id, name): signal_id
+            for asset_id, names in name_to_id.items()
+            for name, signal_id in names.items()
+        }
+    )
+    keys = pd.MultiIndex.from_frame(long_df[["asset_id", "signal_name"]])
+    long_df["signal_id"] = ids.reindex(keys).to_numpy()
+    return long_df[["timestamp", "signal_id", "value"]]
+
+
+def copy_dataframe(connection, table_name: str, frame: pd.DataFrame) -> int:
+    if frame.empty:
+        return 0
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    columns = ", ".join(f'"{col}"' for col in frame.columns)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY "{table_name}" ({columns}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+    return len(frame)
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import shutil
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from db import common
+from db.source_setup import DEFAULT_ASSET_ID, SourceData
+
+
+SOURCE_ARCHIVE_DIR = os.getenv("SOURCE_ARCHIVE_DIR", "archive")
+ARCHIVE_VERSION = 1
+ARCHIVE_INDEX = "index.json"
+ARCHIVE_VARIABLES = ["wind_speed", "power", "ambient_temperature"]
+# Fixed-width little-endian columns; timestamps are int64 epoch nanoseconds so
+# they can be viewed as datetime64[ns] without a copy.
+TIMESTAMP_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<f8")
+
+
+def asset_dir(archive_dir: str, asset_id: int) -> str:
+    # Each asset is a self-contained archive (own index) under its directory.
+    return os.path.join(archive_dir, f"asset_{asset_id}")
+
+
+def column_path(archive_dir: str, day: date, name: str) -> str:
+    return os.path.join(archive_dir, day.isoformat(), f"{name}.bin")
+
+
+def read_index(archive_dir: str) -> dict:
+    path = os.path.join(archive_dir, ARCHIVE_INDEX)
+    if not os.path.exists(path):
+        return {"version": ARCHIVE_VERSION, "variables": ARCHIVE_VARIABLES, "days": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_index(archive_dir: str, index: dict) -> None:
+    path = os.path.join(archive_dir, ARCHIVE_INDEX)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+
+
+def fetch_day_columns(
+    engine, day: date, asset_id: int = DEFAULT_ASSET_ID
+) -> Dict[str, np.ndarray]:
+    start = day_start(day)
+    stmt = (
+        select(
+            SourceData.timestamp,
+            *[getattr(SourceData, var) for var in ARCHIVE_VARIABLES],
+        )
+        .where(SourceData.asset_id == asset_id)
+        .where(SourceData.timestamp >= start)
+        .where(SourceData.timestamp < start + timedelta(days=1))
+        .order_by(SourceData.timestamp)
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+
+    columns = list(zip(*rows)) if rows else [()] * (1 + len(ARCHIVE_VARIABLES))
+    timestamps = pd.DatetimeIndex(list(columns[0]), tz="UTC")
+    result = {"timestamp": timestamps.asi8.astype(TIMESTAMP_DTYPE)}
+    for var, values in zip(ARCHIVE_VARIABLES, columns[1:]):
+        result[var] = np.asarray(values, dtype=VALUE_DTYPE)
+    return result
+
+
+def export_day(
+    engine,
+    day: date,
+    archive_dir: str = SOURCE_ARCHIVE_DIR,
+    asset_id: int = DEFAULT_ASSET_ID,
+) -> int:
+    if day_start(day + timedelta(days=1)) > datetime.now(timezone.utc):
+        raise ValueError(f"Day {day.isoformat()} is not closed yet")
+
+    columns = fetch_day_columns(engine, day, asset_id)
+    archive_dir = asset_dir(archive_dir, asset_id)
+    day_dir = os.path.join(archive_dir, day.isoformat())
+    tmp_dir = f"{day_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, values in columns.items():
+        values.tofile(os.path.join(tmp_dir, f"{name}.bin"))
+
+    # The day directory is swapped in before the index points at it.
+    shutil.rmtree(day_dir, ignore_errors=True)
+    os.replace(tmp_dir, day_dir)
+
+    index = read_index(archive_dir)
+    rows = len(columns["timestamp"])
+    index["days"][day.isoformat()] = {
+        "rows": rows,
+        "first": int(columns["timestamp"][0]) if rows else None,
+        "last": int(columns["timestamp"][-1]) if rows else None,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+    write_index(archive_dir, index)
+    return rows
+
+
+def open_column(archive_dir: str, day: date, name: str, dtype, rows: int):
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(
+        column_path(archive_dir, day, name), dtype=dtype, mode="r", shape=(rows,)
+    )
+
+
+def read_archived_day(
+    day: date,
+    variables: List[str],
+    archive_dir: str = SOURCE_ARCHIVE_DIR,
+    index: Optional[dict] = None,
+) -> Optional[pd.DataFrame]:
+    index = index if index is not None else read_index(archive_dir)
+    entry = index["days"].get(day.isoformat())
+    if entry is None:
+        return None
+
+    rows = entry["rows"]
+    stamps = open_column(archive_dir, day, "timestamp", TIMESTAMP_DTYPE, rows)
+    timestamps = pd.DatetimeIndex(
+        stamps.view("datetime64[ns]"), name="timestamp"
+    ).tz_localize("UTC")
+    values = {
+        var: open_column(archive_dir, day, var, VALUE_DTYPE, rows) for var in variables
+    }
+    return pd.DataFrame(values, index=timestamps, copy=False)
+
+
+def read_archived_window(
+    start: datetime,
+    end: datetime,
+    variables: List[str],
+    archive_dir: str = SOURCE_ARCHIVE_DIR,
+    asset_id: int = DEFAULT_ASSET_ID,
+) -> Optional[pd.DataFrame]:
+    # Only whole UTC days are served from the archive; anything else goes to the API.
+    if not archive_dir:
+        return None
+    archive_dir = asset_dir(archive_dir, asset_id)
+    if not os.path.exists(os.path.join(archive_dir, ARCHIVE_INDEX)):
+        return None
+    start, end = start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+    midnight = datetime.min.time()
+    if start.time() != midnight or end.time() != midnight or start >= end:
+        return None
+
+    index = read_index(archive_dir)
+    frames = []
+    day = start.date()
+    while day < end.date():
+        frame = read_archived_day(day, variables, archive_dir, index)
+        if frame is None:
+            return None
+        frames.append(frame)
+        day += timedelta(days=1)
+    return frames[0] if len(frames) == 1 else pd.concat(frames)
+
+
+def parse_asset_ids(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Exporta dias do banco de origem para o arquivo colunar local"
+    )
+    parser.add_argument("--start", required=True, help="Primeiro dia YYYY-MM-DD (UTC)")
+    parser.add_argument(
+        "--end", help="Último dia YYYY-MM-DD (inclusivo), padrão --start"
+    )
+    parser.add_argument(
+        "--assets",
+        type=parse_asset_ids,
+        default=[DEFAULT_ASSET_ID],
+        help=f"IDs dos ativos separados por vírgula, padrão {DEFAULT_ASSET_ID}",
+    )
+    parser.add_argument(
+        "--dir",
+        default=SOURCE_ARCHIVE_DIR,
+        help=f"Diretório do arquivo, padrão {SOURCE_ARCHIVE_DIR}",
+    )
+    args = parser.parse_args()
+
+    first = date.fromisoformat(args.start)
+    last = date.fromisoformat(args.end or args.start)
+    engine = common.get_engine(common.DB_SOURCE_NAME)
+    for asset_id in args.assets:
+        os.makedirs(asset_dir(args.dir, asset_id), exist_ok=True)
+        day = first
+        while day <= last:
+            rows = export_day(engine, day, args.dir, asset_id)
+            print(f"asset={asset_id} {day.isoformat()}: {rows} rows")
+            day += timedelta(days=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,39 +10,47 @@ from dagster import (
     define_asset_job,
     resource,
 )
-from sqlalchemy import create_engine
 
 from db import common
 from db.target_setup import create_target_schema
 from .etl_daily import (
+    DEFAULT_ASSETS,
+    DEFAULT_BACKFILL_WORKERS,
     DEFAULT_BASE_URL,
-    aggregate_10min,
-    build_day_window_utc,
-    fetch_source_data,
-    write_target,
+    DEFAULT_RESOLUTIONS,
+    fetch_asset_ids,
+    parse_assets,
+    run_backfill,
 )
+from .instrumentation import Stage
+
+
+def merge_stages(results) -> dict:
+    # Stage totals across the partition's assets; memory keeps the peak.
+    merged = {}
+    for result in results:
+        for name, values in result["stages"].items():
+            stage = Stage(name)
+            stage.seconds = values["seconds"]
+            stage.rows, stage.bytes = values["rows"], values["bytes"]
+            stage.peak_traced_bytes = values["peak_traced_bytes"]
+            stage.max_rss_bytes = values["max_rss_bytes"]
+            merged.setdefault(name, Stage(name)).merge(stage)
+    return {name: stage.as_dict() for name, stage in merged.items()}
 
 
 @resource
 def source_engine():
     url = common.build_db_url(common.DB_SOURCE_NAME)
     common.wait_for_connection(url)
-    engine = create_engine(url, pool_pre_ping=True)
-    try:
-        yield engine
-    finally:
-        engine.dispose()
+    return common.get_engine(common.DB_SOURCE_NAME)
 
 
 @resource
 def target_engine():
     url = common.build_db_url(common.DB_TARGET_NAME)
     common.wait_for_connection(url)
-    engine = create_engine(url, pool_pre_ping=True)
-    try:
-        yield engine
-    finally:
-        engine.dispose()
+    return common.get_engine(common.DB_TARGET_NAME)
 
 
 daily_partitions = DailyPartitionsDefinition(start_date="2024-01-01")
@@ -55,23 +63,50 @@ daily_partitions = DailyPartitionsDefinition(start_date="2024-01-01")
 def etl_daily_asset(context, source_engine, target_engine):
     date_str = context.partition_key
     base_url = os.getenv("API_BASE_URL", DEFAULT_BASE_URL)
-
-    start, end = build_day_window_utc(date_str)
-    df = fetch_source_data(base_url, start, end)
-    agg_df = aggregate_10min(df)
+    asset_ids = parse_assets(DEFAULT_ASSETS) or fetch_asset_ids(base_url)
 
     create_target_schema(target_engine)
-    inserted = write_target(target_engine, agg_df, start, end)
-
-    return Output(
-        value=None,
-        metadata={
-            "date": MetadataValue.text(date_str),
-            "source_rows": MetadataValue.int(len(df)),
-            "agg_rows": MetadataValue.int(len(agg_df)),
-            "inserted": MetadataValue.int(inserted),
-        },
+    results = run_backfill(
+        [date_str],
+        base_url,
+        workers=DEFAULT_BACKFILL_WORKERS,
+        resolutions=DEFAULT_RESOLUTIONS,
+        asset_ids=asset_ids,
+        engine=target_engine,
     )
+    failed = [r for r in results if "error" in r]
+    if failed:
+        raise RuntimeError(
+            "; ".join(f"asset {r['asset_id']}: {r['error']}" for r in failed)
+        )
+
+    stages = merge_stages(results)
+    max_rss = max((s["max_rss_bytes"] or 0 for s in stages.values()), default=0)
+    metadata = {
+        "date": MetadataValue.text(date_str),
+        "assets": MetadataValue.int(len(results)),
+        "source_rows": MetadataValue.int(sum(r["source_rows"] for r in results)),
+        "agg_rows": MetadataValue.int(sum(r["agg_rows"] for r in results)),
+        "inserted": MetadataValue.int(sum(r["inserted"] for r in results)),
+        "elapsed_s": MetadataValue.float(max(r["elapsed_s"] for r in results)),
+        "max_rss_mib": MetadataValue.float(round(max_rss / 1024**2, 1)),
+        "run_ids": MetadataValue.text(
+            ",".join(str(r["run_id"]) for r in results if "run_id" in r)
+        ),
+        "stages": MetadataValue.json(stages),
+        **{
+            f"{name}_s": MetadataValue.float(stage["seconds"])
+            for name, stage in stages.items()
+        },
+    }
+    # Traced and RSS peaks measure different things, so they stay separate.
+    traced = [s["peak_traced_bytes"] for s in stages.values()]
+    traced = [value for value in traced if value is not None]
+    if traced:
+        metadata["peak_traced_mib"] = MetadataValue.float(
+            round(max(traced) / 1024**2, 1)
+        )
+    return Output(value=None, metadata=metadata)
 
 
 etl_job = define_asset_job("etl_job", selection=[etl_daily_asset])
@@ -1,38 +1,205 @@
 import argparse
+import io
+import logging
 import os
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
 
 import httpx
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, delete
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import column, delete, exists, func, insert, select, table, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from db import common
-from db.target_setup import Signal, Measurement, create_target_schema
+from db.partitioning import ensure_partitions
+from db.source_setup import DEFAULT_ASSET_ID
+from db.target_setup import (
+    RESOLUTION_SUFFIXES,
+    EtlRun,
+    Measurement,
+    Watermark,
+    create_target_schema,
+    ensure_asset_signals,
+)
+from db.utils import copy_dataframe
+from .archive import SOURCE_ARCHIVE_DIR, read_archived_window
+from .instrumentation import RunMetrics, format_stages, track
+from .streaming import StreamingAggregator, iter_arrow_frames
 
 
 FALLBACK_URL = "http://localhost:8000"
 DEFAULT_BASE_URL = os.getenv("API_BASE_URL", FALLBACK_URL)
+SOURCE_FORMATS = ["json", "arrow", "parquet"]
+DEFAULT_SOURCE_FORMAT = os.getenv("ETL_SOURCE_FORMAT", "arrow")
+HTTP_TIMEOUT_S = 60
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_BACKFILL_WORKERS = int(os.getenv("ETL_BACKFILL_WORKERS", "4"))
+ALL_ASSETS = "all"
+DEFAULT_ASSETS = os.getenv("ETL_ASSETS", ALL_ASSETS)
+WRITE_MODES = ["replace", "upsert"]
+DEFAULT_WRITE_MODE = os.getenv("ETL_WRITE_MODE", "replace")
+STAGING_TABLE = "measurement_staging"
+# 10-min buckets buffered before a streaming write: one week.
+STREAM_WRITE_BUCKETS = int(os.getenv("ETL_STREAM_WRITE_BUCKETS", "1008"))
+STREAM_SOURCE_FORMAT = "arrow"
+ETL_RUN_HISTORY = os.getenv("ETL_RUN_HISTORY", "1") == "1"
 
 RESAMPLE_RULE = "10min"
+BUCKET_MINUTES = pd.Timedelta(RESAMPLE_RULE) // pd.Timedelta(minutes=1)
 REQUEST_VARS = ["wind_speed", "power"]
 AGG_FUNCS = ["mean", "min", "max", "std"]
 
+run_history_log = logging.getLogger("etl.run_history")
+
+
+def parse_resolutions(value: str) -> List[str]:
+    requested = [item.strip() for item in value.split(",") if item.strip()]
+    invalid = [item for item in requested if item not in RESOLUTION_SUFFIXES]
+    if invalid:
+        raise ValueError(
+            f"Invalid resolutions: {invalid}. Allowed: {list(RESOLUTION_SUFFIXES)}"
+        )
+    return [RESAMPLE_RULE] + [
+        rule
+        for rule in RESOLUTION_SUFFIXES
+        if rule in requested and rule != RESAMPLE_RULE
+    ]
+
+
+def build_signal_names(resolutions: List[str]) -> List[str]:
+    return [
+        f"{var}_{stat}_{RESOLUTION_SUFFIXES[rule]}"
+        for rule in resolutions
+        for var in REQUEST_VARS
+        for stat in AGG_FUNCS
+    ]
+
+
+def parse_assets(value: str) -> Optional[List[int]]:
+    # None stands for every asset registered in the source (GET /source/assets).
+    if value.strip().lower() == ALL_ASSETS:
+        return None
+    try:
+        asset_ids = [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid assets: {value}. Expected '{ALL_ASSETS}' or ids")
+    if not asset_ids:
+        raise ValueError("No asset ids given")
+    return list(dict.fromkeys(asset_ids))
+
+
+DEFAULT_RESOLUTIONS = parse_resolutions(os.getenv("ETL_RESOLUTIONS", RESAMPLE_RULE))
+SIGNAL_NAMES = build_signal_names([RESAMPLE_RULE])
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Executa ETL diário da API de origem para o banco de destino"
     )
+    window = parser.add_mutually_exclusive_group(required=True)
+    window.add_argument("--date", help="Data no formato YYYY-MM-DD (dia em UTC)")
+    window.add_argument(
+        "--start", help="Backfill: primeira data YYYY-MM-DD (inclusiva, em UTC)"
+    )
+    window.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Processa apenas dados novos desde a marca d'água gravada no destino",
+    )
+    parser.add_argument(
+        "--since",
+        help="Incremental: início (ISO 8601) quando ainda não há marca d'água, padrão hoje 00:00 UTC",
+    )
     parser.add_argument(
-        "--date", required=True, help="Data no formato YYYY-MM-DD (dia em UTC)"
+        "--end", help="Backfill: última data YYYY-MM-DD (inclusiva), padrão --start"
+    )
+    parser.add_argument(
+        "--assets",
+        type=parse_assets,
+        default=DEFAULT_ASSETS,
+        help=(
+            f"IDs dos ativos separados por vírgula, ou '{ALL_ASSETS}' para todos os "
+            f"ativos da origem, padrão {DEFAULT_ASSETS}"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_BACKFILL_WORKERS,
+        help=(
+            "Pares (dia, ativo) processados em paralelo, "
+            f"padrão {DEFAULT_BACKFILL_WORKERS}"
+        ),
     )
     parser.add_argument(
         "--base-url",
         default=DEFAULT_BASE_URL,
         help=f"URL base da API, padrão {FALLBACK_URL}",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--source-format",
+        default=DEFAULT_SOURCE_FORMAT,
+        choices=SOURCE_FORMATS,
+        help=f"Formato de transferência da API de origem, padrão {DEFAULT_SOURCE_FORMAT}",
+    )
+    parser.add_argument(
+        "--server-aggregate",
+        action="store_true",
+        help="Agrega em janelas de 10 minutos no banco de origem (/source/aggregate)",
+    )
+    parser.add_argument(
+        "--resolutions",
+        type=parse_resolutions,
+        default=DEFAULT_RESOLUTIONS,
+        help=(
+            f"Resoluções gravadas, separadas por vírgula ({', '.join(RESOLUTION_SUFFIXES)}). "
+            "10min é sempre incluída; as demais são derivadas dela em janelas diárias. "
+            f"Padrão {','.join(DEFAULT_RESOLUTIONS)}"
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Processa a janela inteira (--date ou --start/--end) como um único fluxo, "
+            "agregando e gravando à medida que os dados chegam, com memória constante"
+        ),
+    )
+    parser.add_argument(
+        "--write-mode",
+        default=DEFAULT_WRITE_MODE,
+        choices=WRITE_MODES,
+        help=(
+            "replace: apaga e recarrega a janela; upsert: grava só as linhas alteradas "
+            f"(INSERT ... ON CONFLICT), padrão {DEFAULT_WRITE_MODE}"
+        ),
+    )
+    args = parser.parse_args()
+    if args.stream:
+        # The stream path always reads Arrow batches and writes 10-min rows only.
+        if args.incremental or args.server_aggregate:
+            parser.error(
+                "--stream não pode ser usado com --incremental ou --server-aggregate"
+            )
+        if args.source_format != STREAM_SOURCE_FORMAT:
+            parser.error(
+                f"--stream só lê a origem em {STREAM_SOURCE_FORMAT}, "
+                f"recebido --source-format {args.source_format}"
+            )
+        if args.resolutions != [RESAMPLE_RULE]:
+            parser.error(
+                f"--stream só grava a resolução {RESAMPLE_RULE}, "
+                f"recebido --resolutions {','.join(args.resolutions)}"
+            )
+    return args
 
 
 def build_day_window_utc(date_str: str) -> tuple[datetime, datetime]:
@@ -42,35 +209,211 @@ def build_day_window_utc(date_str: str) -> tuple[datetime, datetime]:
     return start, end
 
 
-def fetch_source_data(base_url: str, start: datetime, end: datetime) -> pd.DataFrame:
-    params = {
-        "start": start.isoformat().replace("+00:00", "Z"),
-        "end": end.isoformat().replace("+00:00", "Z"),
-        "variables": REQUEST_VARS,
-    }
-    date_params = [
-        ("start", params["start"]),
-        ("end", params["end"]),
+def build_window_params(start: datetime, end: datetime) -> list[tuple[str, str]]:
+    return [
+        ("start", start.isoformat().replace("+00:00", "Z")),
+        ("end", end.isoformat().replace("+00:00", "Z")),
     ]
-    variables_params = [("variables", v) for v in params["variables"]]
-    query_params = date_params + variables_params
-    url = f"{base_url.rstrip('/')}/source/data"
-    with httpx.Client(timeout=60) as client:
-        resp = client.get(url, params=query_params)
-        resp.raise_for_status()
-        data = resp.json()
 
-    if not data:
-        return pd.DataFrame(columns=["timestamp", *REQUEST_VARS]).set_index("timestamp")
 
-    df = pd.DataFrame(data)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+def read_source_payload(
+    resp: httpx.Response, fmt: str, columns: List[str]
+) -> pd.DataFrame:
+    if fmt == "json":
+        data = resp.json()
+        if not data:
+            return pd.DataFrame(columns=["timestamp", *columns]).set_index("timestamp")
+        df = pd.DataFrame(data)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    elif fmt == "parquet":
+        df = pq.read_table(io.BytesIO(resp.content)).to_pandas()
+    else:
+        df = pa.ipc.open_stream(resp.content).read_all().to_pandas()
     df = df.set_index("timestamp").sort_index()
 
-    for col in REQUEST_VARS:
+    for col in columns:
         if col not in df.columns:
             df[col] = pd.NA
-    return df[REQUEST_VARS]
+    return df[columns]
+
+
+def request_source(
+    url: str, params: list, client: Optional[httpx.Client] = None
+) -> httpx.Response:
+    if client is None:
+        with httpx.Client(timeout=HTTP_TIMEOUT_S) as own_client:
+            return request_source(url, params, own_client)
+    resp = client.get(url, params=params)
+    resp.raise_for_status()
+    return resp
+
+
+def fetch_source_payload(
+    url: str,
+    params: list,
+    fmt: str,
+    columns: List[str],
+    client: Optional[httpx.Client] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> pd.DataFrame:
+    # Pages are followed when the API caps the rows of a request.
+    frames = []
+    page_params = params
+    while True:
+        with track(metrics, "fetch") as stage:
+            resp = request_source(url, page_params, client)
+            stage.bytes = resp.num_bytes_downloaded
+        with track(metrics, "parse") as stage:
+            frames.append(read_source_payload(resp, fmt, columns))
+            stage.rows, stage.bytes = len(frames[-1]), len(resp.content)
+        cursor = resp.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+        page_params = params + [("cursor", cursor)]
+    return frames[0] if len(frames) == 1 else pd.concat(frames)
+
+
+def fetch_source_data(
+    base_url: str,
+    start: datetime,
+    end: datetime,
+    fmt: str = DEFAULT_SOURCE_FORMAT,
+    client: Optional[httpx.Client] = None,
+    archive_dir: Optional[str] = SOURCE_ARCHIVE_DIR,
+    asset_id: int = DEFAULT_ASSET_ID,
+    metrics: Optional[RunMetrics] = None,
+) -> pd.DataFrame:
+    with track(metrics, "archive_read") as stage:
+        archived = read_archived_window(start, end, REQUEST_VARS, archive_dir, asset_id)
+        stage.rows = len(archived) if archived is not None else 0
+    if archived is not None:
+        return archived
+
+    variables_params = [("variables", v) for v in REQUEST_VARS]
+    query_params = (
+        build_window_params(start, end)
+        + variables_params
+        + [("asset_id", asset_id), ("format", fmt)]
+    )
+    url = f"{base_url.rstrip('/')}/source/data"
+    return fetch_source_payload(url, query_params, fmt, REQUEST_VARS, client, metrics)
+
+
+def iter_source_frames(
+    base_url: str,
+    start: datetime,
+    end: datetime,
+    client: Optional[httpx.Client] = None,
+    asset_id: int = DEFAULT_ASSET_ID,
+    metrics: Optional[RunMetrics] = None,
+) -> Iterator[pd.DataFrame]:
+    if client is None:
+        with httpx.Client(timeout=HTTP_TIMEOUT_S) as own_client:
+            yield from iter_source_frames(
+                base_url, start, end, own_client, asset_id, metrics
+            )
+        return
+
+    query_params = (
+        build_window_params(start, end)
+        + [("variables", v) for v in REQUEST_VARS]
+        + [("asset_id", asset_id), ("format", STREAM_SOURCE_FORMAT)]
+    )
+    url = f"{base_url.rstrip('/')}/source/data"
+    page_params = query_params
+    while True:
+        with client.stream("GET", url, params=page_params) as resp:
+            resp.raise_for_status()
+            yield from iter_arrow_frames(resp.iter_bytes())
+            if metrics is not None:
+                metrics.add("fetch", bytes=resp.num_bytes_downloaded)
+            cursor = resp.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return
+        page_params = query_params + [("cursor", cursor)]
+
+
+def fetch_source_aggregates(
+    base_url: str,
+    start: datetime,
+    end: datetime,
+    fmt: str = DEFAULT_SOURCE_FORMAT,
+    client: Optional[httpx.Client] = None,
+    asset_id: int = DEFAULT_ASSET_ID,
+    metrics: Optional[RunMetrics] = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    stats = [*AGG_FUNCS, "count"]
+    query_params = (
+        build_window_params(start, end)
+        + [("interval", RESAMPLE_RULE)]
+        + [("variables", v) for v in REQUEST_VARS]
+        + [("stats", stat) for stat in stats]
+        + [("asset_id", asset_id), ("format", fmt)]
+    )
+    url = f"{base_url.rstrip('/')}/source/aggregate"
+    columns = [f"{var}_{stat}" for var in REQUEST_VARS for stat in stats]
+    df = fetch_source_payload(url, query_params, fmt, columns, client, metrics)
+    counts = df[[f"{var}_count" for var in REQUEST_VARS]].fillna(0).astype(int)
+    counts.columns = REQUEST_VARS
+    agg = df[[f"{var}_{stat}" for var in REQUEST_VARS for stat in AGG_FUNCS]]
+    agg.columns = [f"{col}_10m" for col in agg.columns]
+    return agg.astype(float), counts
+
+
+def aggregate_10min_numpy(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    # Whole-minute, strictly increasing input is laid on a dense minute grid
+    # (gaps stay NaN) and reshaped to (variables, minute of bucket, buckets), so
+    # every stat is one reduction over axis 1. Anything else returns None.
+    index = df.index
+    if not isinstance(index, pd.DatetimeIndex) or len(index) == 0:
+        return None
+    minute = pd.Timedelta(minutes=1) // pd.Timedelta(1, unit=index.unit)
+    ticks = index.asi8
+    if (ticks % minute).any():
+        return None
+    slots = ticks // minute
+    if len(slots) > 1 and (np.diff(slots) <= 0).any():
+        return None
+
+    width = BUCKET_MINUTES
+    slots = slots - slots[0] // width * width
+    n_buckets = int(slots[-1] // width) + 1
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan).T
+    flat = np.full((df.shape[1], n_buckets * width), np.nan)
+    if slots[-1] - slots[0] == len(slots) - 1:
+        flat[:, slots[0] : slots[-1] + 1] = values
+    else:
+        flat[:, slots] = values
+    grid = np.ascontiguousarray(flat.reshape(-1, n_buckets, width).transpose(0, 2, 1))
+
+    valid = ~np.isnan(grid)
+    count = valid.sum(axis=1)
+    filled = np.where(valid, grid, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = filled.sum(axis=1) / count
+        deviation = np.where(valid, filled - mean[:, None, :], 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=1) / (count - 1))
+    std[count < 2] = np.nan
+    # fmin/fmax skip NaN and yield NaN only for all-empty buckets.
+    low = np.fmin.reduce(grid, axis=1)
+    high = np.fmax.reduce(grid, axis=1)
+
+    stats = {"mean": mean, "min": low, "max": high, "std": std}
+    result_index = pd.date_range(
+        index[0].floor(RESAMPLE_RULE),
+        periods=n_buckets,
+        freq=RESAMPLE_RULE,
+        name=index.name,
+        unit=index.unit,
+    )
+    return pd.DataFrame(
+        {
+            f"{var}_{stat}_10m": stats[stat][i]
+            for i, var in enumerate(df.columns)
+            for stat in AGG_FUNCS
+        },
+        index=result_index,
+    )
 
 
 def aggregate_10min(df: pd.DataFrame) -> pd.DataFrame:
@@ -81,96 +424,689 @@ def aggregate_10min(df: pd.DataFrame) -> pd.DataFrame:
             for agg in ["mean", "min", "max", "std"]
         ]
         return pd.DataFrame(columns=cols)
+    agg = aggregate_10min_numpy(df)
+    if agg is not None:
+        return agg
     agg = df.resample(RESAMPLE_RULE).agg(AGG_FUNCS)
     agg.columns = [f"{var}_{stat}_10m" for var, stat in agg.columns]
     return agg
 
 
-def ensure_signals(session: Session, signal_names: List[str]) -> Dict[str, int]:
-    existing = session.query(Signal).filter(Signal.name.in_(signal_names)).all()
-    name_to_id = {s.name: s.id for s in existing}
-    missing = [n for n in signal_names if n not in name_to_id]
-    if missing:
-        session.add_all([Signal(name=n) for n in missing])
-        session.commit()
-        existing = session.query(Signal).filter(Signal.name.in_(signal_names)).all()
-        name_to_id = {s.name: s.id for s in existing}
-    return name_to_id
+def count_10min(df: pd.DataFrame) -> pd.DataFrame:
+    return df.notna().groupby(df.index.floor(RESAMPLE_RULE)).sum()
 
 
-def write_target(engine, agg_df: pd.DataFrame, start: datetime, end: datetime) -> int:
+def rollup_10min(agg_df: pd.DataFrame, counts: pd.DataFrame, rule: str) -> pd.DataFrame:
+    # Each 10-min bucket is a partial (count, sum, centered sum of squares, min,
+    # max); partials merge exactly, so no raw row is read twice. Summing squares
+    # around each bucket's own mean avoids the cancellation of a raw sumsq.
+    suffix = RESOLUTION_SUFFIXES[rule]
+    counts = counts.reindex(agg_df.index, fill_value=0)
+    bucket = agg_df.index.floor(rule)
+    columns = {}
+    for var in REQUEST_VARS:
+        n = counts[var].astype(float)
+        mean = agg_df[f"{var}_mean_10m"].where(n > 0, 0.0)
+        m2 = (agg_df[f"{var}_std_10m"] ** 2 * (n - 1)).where(n > 1, 0.0)
+
+        total = n.groupby(bucket).sum()
+        rolled_mean = (mean * n).groupby(bucket).sum() / total.where(total > 0)
+        spread = n * (mean - rolled_mean.reindex(bucket).to_numpy()) ** 2
+        rolled_m2 = (
+            m2.groupby(bucket).sum() + spread.where(n > 0, 0.0).groupby(bucket).sum()
+        )
+
+        columns[f"{var}_mean_{suffix}"] = rolled_mean
+        columns[f"{var}_min_{suffix}"] = agg_df[f"{var}_min_10m"].groupby(bucket).min()
+        columns[f"{var}_max_{suffix}"] = agg_df[f"{var}_max_10m"].groupby(bucket).max()
+        columns[f"{var}_std_{suffix}"] = np.sqrt(rolled_m2 / (total - 1)).where(
+            total > 1
+        )
+    return pd.DataFrame(columns).rename_axis(agg_df.index.name)
+
+
+def add_rollups(
+    agg_df: pd.DataFrame, counts: pd.DataFrame, resolutions: List[str]
+) -> pd.DataFrame:
+    rollups = [
+        rollup_10min(agg_df, counts, rule)
+        for rule in resolutions
+        if rule != RESAMPLE_RULE
+    ]
+    if agg_df.empty or not rollups:
+        return agg_df
+    # Coarser buckets share the frame; build_measurement_frame drops the NaN gaps.
+    return pd.concat([agg_df, *rollups], axis=1)
+
+
+def ensure_signals(
+    session: Session, signal_names: List[str], asset_id: int = DEFAULT_ASSET_ID
+) -> Dict[str, int]:
+    return ensure_asset_signals(session, signal_names, [asset_id])[asset_id]
+
+
+def build_measurement_frame(
+    agg_df: pd.DataFrame, name_to_id: Dict[str, int]
+) -> pd.DataFrame:
+    signal_cols = [name for name in name_to_id if name in agg_df.columns]
+    long_df = (
+        agg_df[signal_cols]
+        .rename_axis("timestamp")
+        .reset_index()
+        .melt(id_vars="timestamp", var_name="signal_name", value_name="value")
+        .dropna(subset=["value"])
+    )
+    long_df["signal_id"] = long_df["signal_name"].map(name_to_id)
+    return long_df[["timestamp", "signal_id", "value"]]
+
+
+def upsert_measurements(
+    conn, long_df: pd.DataFrame, start: datetime, end: datetime, signal_ids: List[int]
+) -> int:
+    conn.execute(
+        text(
+            f'CREATE TEMP TABLE "{STAGING_TABLE}" '
+            f'(LIKE "{Measurement.__tablename__}" INCLUDING DEFAULTS) ON COMMIT DROP'
+        )
+    )
+    copy_dataframe(conn, STAGING_TABLE, long_df)
+    staging = table(
+        STAGING_TABLE, column("timestamp"), column("signal_id"), column("value")
+    )
+
+    # Buckets that vanished from the new aggregation (e.g. now all-NaN).
+    conn.execute(
+        delete(Measurement)
+        .where(Measurement.timestamp >= start)
+        .where(Measurement.timestamp < end)
+        .where(Measurement.signal_id.in_(signal_ids))
+        .where(
+            ~exists()
+            .where(staging.c.timestamp == Measurement.timestamp)
+            .where(staging.c.signal_id == Measurement.signal_id)
+        )
+    )
+
+    stmt = pg_insert(Measurement).from_select(
+        ["timestamp", "signal_id", "value"],
+        select(staging.c.timestamp, staging.c.signal_id, staging.c.value),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Measurement.timestamp, Measurement.signal_id],
+        set_={"value": stmt.excluded.value},
+        where=Measurement.value.is_distinct_from(stmt.excluded.value),
+    )
+    return conn.execute(stmt).rowcount
+
+
+def write_target(
+    engine,
+    agg_df: pd.DataFrame,
+    start: datetime,
+    end: datetime,
+    mode: str = DEFAULT_WRITE_MODE,
+    signal_names: List[str] = SIGNAL_NAMES,
+    asset_id: int = DEFAULT_ASSET_ID,
+    metrics: Optional[RunMetrics] = None,
+) -> int:
+    if mode not in WRITE_MODES:
+        raise ValueError(f"Invalid write mode: {mode}. Allowed: {WRITE_MODES}")
     if agg_df.empty:
         return 0
 
+    with track(metrics, "write_prepare") as stage:
+        with Session(engine) as session:
+            name_to_id = ensure_signals(session, signal_names, asset_id)
+
+        long_df = build_measurement_frame(agg_df, name_to_id)
+        signal_ids = list(name_to_id.values())
+        ensure_partitions(engine, Measurement.__tablename__, start, end)
+        stage.rows = len(long_df)
+
+    with engine.begin() as conn:
+        if mode == "upsert":
+            with track(metrics, "write_upsert") as stage:
+                stage.rows = upsert_measurements(conn, long_df, start, end, signal_ids)
+            return stage.rows
+
+        # Delete and COPY share one transaction: readers never see a half-written day.
+        with track(metrics, "write_delete") as stage:
+            stage.rows = conn.execute(
+                delete(Measurement)
+                .where(Measurement.timestamp >= start)
+                .where(Measurement.timestamp < end)
+                .where(Measurement.signal_id.in_(signal_ids))
+            ).rowcount
+        with track(metrics, "write_copy") as stage:
+            stage.rows = copy_dataframe(conn, Measurement.__tablename__, long_df)
+        return stage.rows
+
+
+def build_target_engine(pool_size: Optional[int] = None):
+    # The schema is created once here; runs handed an engine expect it to exist.
+    common.create_database_if_not_exists(common.DB_TARGET_NAME)
+    tgt_url = common.build_db_url(common.DB_TARGET_NAME)
+    common.wait_for_connection(tgt_url)
+    engine = common.get_engine(common.DB_TARGET_NAME, pool_size=pool_size)
+    create_target_schema(engine)
+    return engine
+
+
+class RunRecord:
+    def __init__(self, mode: str, asset_id: int, start=None, end=None):
+        self.mode = mode
+        self.asset_id = asset_id
+        self.window_start = start
+        self.window_end = end
+        self.metrics = RunMetrics()
+        self.result: dict = {}
+
+
+def save_run(
+    engine, record: RunRecord, started_at: datetime, error: Optional[str] = None
+) -> int:
+    stmt = (
+        insert(EtlRun)
+        .values(
+            mode=record.mode,
+            asset_id=record.asset_id,
+            window_start=record.window_start,
+            window_end=record.window_end,
+            started_at=started_at,
+            finished_at=datetime.now(timezone.utc),
+            status="failed" if error is not None else "success",
+            error=error,
+            source_rows=record.result.get("source_rows"),
+            agg_rows=record.result.get("agg_rows"),
+            inserted=record.result.get("inserted"),
+            duration_s=record.metrics.elapsed_s,
+            stages=record.metrics.as_dict(),
+        )
+        .returning(EtlRun.id)
+    )
+    with engine.begin() as conn:
+        return conn.execute(stmt).scalar_one()
+
+
+@contextmanager
+def recorded_run(
+    engine, mode: str, asset_id: int, start=None, end=None
+) -> Iterator[RunRecord]:
+    # The run fills record.result; its stage timings are added to it and,
+    # unless ETL_RUN_HISTORY=0, one etl_run row is written, failures included.
+    record = RunRecord(mode, asset_id, start, end)
+    started_at = datetime.now(timezone.utc)
+    try:
+        yield record
+    except Exception as exc:
+        if ETL_RUN_HISTORY:
+            try:
+                save_run(engine, record, started_at, error=str(exc))
+            except Exception:
+                # Never let the history write hide the error that failed the run.
+                run_history_log.exception("could not record failed %s run", mode)
+        raise
+    record.result["stages"] = record.metrics.as_dict()
+    if ETL_RUN_HISTORY:
+        record.result["run_id"] = save_run(engine, record, started_at)
+
+
+def run_etl_for_date(
+    date_str: str,
+    base_url: str = DEFAULT_BASE_URL,
+    source_format: str = DEFAULT_SOURCE_FORMAT,
+    server_aggregate: bool = False,
+    engine=None,
+    client: Optional[httpx.Client] = None,
+    write_mode: str = DEFAULT_WRITE_MODE,
+    resolutions: Optional[List[str]] = None,
+    asset_id: int = DEFAULT_ASSET_ID,
+) -> dict:
+    start, end = build_day_window_utc(date_str)
+    resolutions = resolutions or DEFAULT_RESOLUTIONS
+    tgt_engine = engine if engine is not None else build_target_engine()
+
+    with recorded_run(tgt_engine, "daily", asset_id, start, end) as run:
+        metrics = run.metrics
+        if server_aggregate:
+            agg_df, counts = fetch_source_aggregates(
+                base_url, start, end, source_format, client, asset_id, metrics
+            )
+            source_rows = counts[REQUEST_VARS[0]].sum()
+        else:
+            df = fetch_source_data(
+                base_url,
+                start,
+                end,
+                source_format,
+                client,
+                asset_id=asset_id,
+                metrics=metrics,
+            )
+            with track(metrics, "aggregate") as stage:
+                agg_df = aggregate_10min(df)
+                counts = count_10min(df) if len(resolutions) > 1 else None
+                stage.rows = len(df)
+            source_rows = len(df)
+
+        with track(metrics, "rollup") as stage:
+            target_df = add_rollups(agg_df, counts, resolutions)
+            stage.rows = len(agg_df)
+        inserted = write_target(
+            tgt_engine,
+            target_df,
+            start,
+            end,
+            write_mode,
+            build_signal_names(resolutions),
+            asset_id,
+            metrics,
+        )
+
+        run.result = {
+            "date": date_str,
+            "asset_id": asset_id,
+            "window_start": start.isoformat(),
+            "window_end": end.isoformat(),
+            "source_rows": int(source_rows),
+            "agg_rows": int(len(agg_df)),
+            "inserted": int(inserted),
+        }
+    return run.result
+
+
+def run_etl_streaming(
+    start: datetime,
+    end: datetime,
+    base_url: str = DEFAULT_BASE_URL,
+    engine=None,
+    client: Optional[httpx.Client] = None,
+    write_mode: str = DEFAULT_WRITE_MODE,
+    asset_id: int = DEFAULT_ASSET_ID,
+) -> dict:
+    tgt_engine = engine if engine is not None else build_target_engine()
+    aggregator = StreamingAggregator(REQUEST_VARS, RESAMPLE_RULE, suffix="_10m")
+    pending: List[pd.DataFrame] = []
+    written_until = start
+    agg_rows = 0
+    inserted = 0
+
+    def write_pending(until: datetime) -> None:
+        nonlocal pending, written_until, agg_rows, inserted
+        parts = [part for part in pending if not part.empty]
+        frame = pd.concat(parts) if parts else pd.DataFrame()
+        inserted += write_target(
+            tgt_engine,
+            frame,
+            written_until,
+            until,
+            write_mode,
+            asset_id=asset_id,
+            metrics=metrics,
+        )
+        agg_rows += len(frame)
+        pending, written_until = [], until
+
+    with recorded_run(tgt_engine, "stream", asset_id, start, end) as run:
+        metrics = run.metrics
+        frames = iter_source_frames(base_url, start, end, client, asset_id, metrics)
+        while True:
+            # Fetch time is network plus Arrow decoding, one record batch at a time.
+            with track(metrics, "fetch") as stage:
+                frame = next(frames, None)
+                stage.rows = len(frame) if frame is not None else 0
+            if frame is None:
+                break
+            with track(metrics, "aggregate") as stage:
+                closed = aggregator.feed(frame)
+                stage.rows = len(frame)
+            if closed.empty:
+                continue
+            pending.append(closed)
+            if sum(len(part) for part in pending) >= STREAM_WRITE_BUCKETS:
+                # Closed buckets are final, so their window can be written right away.
+                write_pending(closed.index[-1] + pd.Timedelta(RESAMPLE_RULE))
+
+        with track(metrics, "aggregate"):
+            pending.append(aggregator.flush())
+        write_pending(end)
+
+        run.result = {
+            "asset_id": asset_id,
+            "window_start": start.isoformat(),
+            "window_end": end.isoformat(),
+            "source_rows": int(aggregator.rows),
+            "agg_rows": int(agg_rows),
+            "inserted": int(inserted),
+        }
+    return run.result
+
+
+def floor_to_bucket(ts: datetime) -> datetime:
+    return pd.Timestamp(ts).floor(RESAMPLE_RULE).to_pydatetime()
+
+
+def read_watermark(engine, signal_ids: List[int]) -> Optional[datetime]:
     with Session(engine) as session:
-        create_target_schema(engine)
+        count, oldest = session.execute(
+            select(func.count(), func.min(Watermark.last_timestamp)).where(
+                Watermark.signal_id.in_(signal_ids)
+            )
+        ).one()
+    # A signal without a watermark has never been loaded incrementally.
+    if count < len(signal_ids):
+        return None
+    return oldest
+
 
-        signal_names = [
-            f"{var}_{stat}_10m" for var in REQUEST_VARS for stat in AGG_FUNCS
+def save_watermark(engine, signal_ids: List[int], last_timestamp: datetime) -> None:
+    now = datetime.now(timezone.utc)
+    stmt = pg_insert(Watermark).values(
+        [
+            {
+                "signal_id": signal_id,
+                "last_timestamp": last_timestamp,
+                "updated_at": now,
+            }
+            for signal_id in signal_ids
         ]
-        name_to_id = ensure_signals(session, signal_names)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Watermark.signal_id],
+        set_={
+            "last_timestamp": func.greatest(
+                Watermark.last_timestamp, stmt.excluded.last_timestamp
+            ),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
 
-        signal_ids = list(name_to_id.values())
-        session.execute(
-            delete(Measurement)
-            .where(Measurement.timestamp >= start)
-            .where(Measurement.timestamp < end)
-            .where(Measurement.signal_id.in_(signal_ids))
-        )
-        session.commit()
+
+def run_etl_incremental(
+    base_url: str = DEFAULT_BASE_URL,
+    source_format: str = DEFAULT_SOURCE_FORMAT,
+    server_aggregate: bool = False,
+    since: Optional[datetime] = None,
+    engine=None,
+    client: Optional[httpx.Client] = None,
+    asset_id: int = DEFAULT_ASSET_ID,
+) -> dict:
+    tgt_engine = engine if engine is not None else build_target_engine()
+
+    with recorded_run(tgt_engine, "incremental", asset_id) as run:
+        metrics = run.metrics
+        with track(metrics, "watermark_read"):
+            with Session(tgt_engine) as session:
+                signal_ids = list(
+                    ensure_signals(session, SIGNAL_NAMES, asset_id).values()
+                )
+            watermark = read_watermark(tgt_engine, signal_ids)
+        if watermark is not None:
+            # Re-read the still open bucket so it is recomputed with its new rows.
+            start = floor_to_bucket(watermark)
+        elif since is not None:
+            start = floor_to_bucket(since)
+        else:
+            start = datetime.now(timezone.utc).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+        end = datetime.now(timezone.utc)
+        run.window_start, run.window_end = start, end
+
+        if server_aggregate:
+            agg_df, counts = fetch_source_aggregates(
+                base_url, start, end, source_format, client, asset_id, metrics
+            )
+            source_rows = counts[REQUEST_VARS[0]].sum()
+            # Bucket starts are a valid watermark: they floor to themselves.
+            last_seen = agg_df.index.max() if not agg_df.empty else None
+        else:
+            df = fetch_source_data(
+                base_url,
+                start,
+                end,
+                source_format,
+                client,
+                asset_id=asset_id,
+                metrics=metrics,
+            )
+            with track(metrics, "aggregate") as stage:
+                agg_df = aggregate_10min(df)
+                stage.rows = len(df)
+            source_rows = len(df)
+            last_seen = df.index.max() if not df.empty else None
 
         inserted = 0
-        for signal_name, signal_id in name_to_id.items():
-            if signal_name not in agg_df.columns:
-                continue
+        if last_seen is not None:
+            write_end = floor_to_bucket(last_seen) + pd.Timedelta(RESAMPLE_RULE)
+            inserted = write_target(
+                tgt_engine,
+                agg_df,
+                start,
+                write_end,
+                mode="upsert",
+                asset_id=asset_id,
+                metrics=metrics,
+            )
+            with track(metrics, "watermark_write"):
+                save_watermark(tgt_engine, signal_ids, last_seen.to_pydatetime())
+
+        run.result = {
+            "asset_id": asset_id,
+            "window_start": start.isoformat(),
+            "window_end": end.isoformat(),
+            "watermark": last_seen.isoformat() if last_seen is not None else None,
+            "source_rows": int(source_rows),
+            "agg_rows": int(len(agg_df)),
+            "inserted": int(inserted),
+        }
+    return run.result
 
-            sub = agg_df[[signal_name]].dropna().rename(columns={signal_name: "value"})
-            if sub.empty:
-                continue
 
-            sub = sub.reset_index()
-            sub["signal_id"] = signal_id
+def build_date_range(start_str: str, end_str: str) -> List[str]:
+    first = date.fromisoformat(start_str)
+    last = date.fromisoformat(end_str)
+    if last < first:
+        raise ValueError("--end must not be before --start")
+    return [
+        (first + timedelta(days=offset)).isoformat()
+        for offset in range((last - first).days + 1)
+    ]
+
 
-            sub.to_sql(
-                name=Measurement.__tablename__,
-                con=engine,
-                if_exists="append",
-                index=False,
+def run_backfill(
+    dates: List[str],
+    base_url: str = DEFAULT_BASE_URL,
+    source_format: str = DEFAULT_SOURCE_FORMAT,
+    server_aggregate: bool = False,
+    workers: int = DEFAULT_BACKFILL_WORKERS,
+    on_result=None,
+    write_mode: str = DEFAULT_WRITE_MODE,
+    resolutions: Optional[List[str]] = None,
+    asset_ids: Optional[List[int]] = None,
+    engine=None,
+) -> List[dict]:
+    resolutions = resolutions or DEFAULT_RESOLUTIONS
+    asset_ids = asset_ids or [DEFAULT_ASSET_ID]
+    tasks = [(date_str, asset_id) for date_str in dates for asset_id in asset_ids]
+    workers = max(1, min(workers, len(tasks)))
+    if engine is None:
+        engine = build_target_engine(pool_size=workers)
+    with Session(engine) as session:
+        # Created up front so parallel tasks never race on the unique signal names.
+        ensure_asset_signals(session, build_signal_names(resolutions), asset_ids)
+
+    def run_task(date_str: str, asset_id: int) -> dict:
+        started = time.perf_counter()
+        try:
+            result = run_etl_for_date(
+                date_str,
+                base_url,
+                source_format,
+                server_aggregate,
+                engine=engine,
+                client=client,
+                write_mode=write_mode,
+                resolutions=resolutions,
+                asset_id=asset_id,
             )
-            inserted += len(sub)
+        except Exception as exc:  # noqa: BLE001
+            result = {"date": date_str, "asset_id": asset_id, "error": str(exc)}
+        elapsed = time.perf_counter() - started
+        result["elapsed_s"] = round(elapsed, 3)
+        if "source_rows" in result:
+            result["source_rows_per_s"] = round(result["source_rows"] / elapsed, 1)
+        return result
 
-    return inserted
+    results = []
+    limits = httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+    with httpx.Client(timeout=HTTP_TIMEOUT_S, limits=limits) as client:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_task, *task) for task in tasks]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
 
+    return sorted(results, key=lambda r: (r["date"], r["asset_id"]))
 
-def run_etl_for_date(date_str: str, base_url: str = DEFAULT_BASE_URL) -> dict:
-    start, end = build_day_window_utc(date_str)
 
-    df = fetch_source_data(base_url, start, end)
-    agg_df = aggregate_10min(df)
+def run_for_assets(asset_ids: List[int], run_asset, workers: int) -> List[dict]:
+    workers = max(1, min(workers, len(asset_ids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_asset, asset_ids))
+
+
+def fetch_asset_ids(base_url: str, client: Optional[httpx.Client] = None) -> List[int]:
+    url = f"{base_url.rstrip('/')}/source/assets"
+    return [asset["id"] for asset in request_source(url, [], client).json()]
 
-    common.create_database_if_not_exists(common.DB_TARGET_NAME)
-    tgt_url = common.build_db_url(common.DB_TARGET_NAME)
-    common.wait_for_connection(tgt_url)
-    tgt_engine = create_engine(tgt_url, pool_pre_ping=True)
-    inserted = write_target(tgt_engine, agg_df, start, end)
 
-    return {
-        "date": date_str,
-        "window_start": start.isoformat(),
-        "window_end": end.isoformat(),
-        "source_rows": int(len(df)),
-        "agg_rows": int(len(agg_df)),
-        "inserted": int(inserted),
-    }
+def print_backfill_result(result: dict) -> None:
+    task = f"date={result['date']} asset={result['asset_id']}"
+    if "error" in result:
+        print(f"ETL {task} FAILED in {result['elapsed_s']}s: {result['error']}")
+        return
+    print(
+        f"ETL {task} source_rows={result['source_rows']} "
+        f"agg_rows={result['agg_rows']} inserted={result['inserted']} "
+        f"elapsed={result['elapsed_s']}s ({result['source_rows_per_s']} rows/s)"
+    )
 
 
 def main() -> None:
     args = parse_args()
-    result = run_etl_for_date(args.date, args.base_url)
+    asset_ids = args.assets or fetch_asset_ids(args.base_url) or [DEFAULT_ASSET_ID]
+
+    if args.incremental:
+        since = datetime.fromisoformat(args.since) if args.since else None
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        engine = build_target_engine(pool_size=min(args.workers, len(asset_ids)))
+        results = run_for_assets(
+            asset_ids,
+            lambda asset_id: run_etl_incremental(
+                args.base_url,
+                args.source_format,
+                args.server_aggregate,
+                since,
+                engine=engine,
+                asset_id=asset_id,
+            ),
+            args.workers,
+        )
+        for result in results:
+            print(
+                f"ETL incremental asset={result['asset_id']} "
+                f"window=[{result['window_start']}, {result['window_end']})\n"
+                f"Source rows: {result['source_rows']} -> 10-min rows: {result['agg_rows']}\n"
+                f"Upserted measurements: {result['inserted']} watermark={result['watermark']}\n"
+                f"Stages: {format_stages(result['stages'])}"
+            )
+        return
+
+    if args.stream:
+        dates = build_date_range(
+            args.start or args.date, args.end or args.start or args.date
+        )
+        start, _ = build_day_window_utc(dates[0])
+        _, end = build_day_window_utc(dates[-1])
+        engine = build_target_engine(pool_size=min(args.workers, len(asset_ids)))
+        started = time.perf_counter()
+        results = run_for_assets(
+            asset_ids,
+            lambda asset_id: run_etl_streaming(
+                start,
+                end,
+                args.base_url,
+                engine=engine,
+                write_mode=args.write_mode,
+                asset_id=asset_id,
+            ),
+            args.workers,
+        )
+        elapsed = time.perf_counter() - started
+        source_rows = sum(result["source_rows"] for result in results)
+        for result in results:
+            print(
+                f"ETL stream asset={result['asset_id']} "
+                f"window=[{result['window_start']}, {result['window_end']})\n"
+                f"Source rows: {result['source_rows']} -> 10-min rows: {result['agg_rows']}\n"
+                f"Inserted measurements: {result['inserted']}\n"
+                f"Stages: {format_stages(result['stages'])}"
+            )
+        print(
+            f"Stream: {len(results)} assets in {elapsed:.1f}s "
+            f"({source_rows / elapsed:.0f} source rows/s)"
+        )
+        return
+
+    if args.start or len(asset_ids) > 1:
+        first = args.start or args.date
+        dates = build_date_range(first, args.end or first)
+        started = time.perf_counter()
+        results = run_backfill(
+            dates,
+            args.base_url,
+            args.source_format,
+            args.server_aggregate,
+            args.workers,
+            on_result=print_backfill_result,
+            write_mode=args.write_mode,
+            resolutions=args.resolutions,
+            asset_ids=asset_ids,
+        )
+        elapsed = time.perf_counter() - started
+        failed = [f"{r['date']}/{r['asset_id']}" for r in results if "error" in r]
+        total_rows = sum(r.get("source_rows", 0) for r in results)
+        print(
+            f"Backfill {dates[0]} -> {dates[-1]} x {len(asset_ids)} assets: "
+            f"{len(results) - len(failed)}/{len(results)} tasks "
+            f"in {elapsed:.1f}s ({total_rows / elapsed:.0f} source rows/s)"
+        )
+        if failed:
+            print(f"Failed date/asset: {', '.join(failed)}")
+            sys.exit(1)
+        return
+
+    result = run_etl_for_date(
+        args.date,
+        args.base_url,
+        args.source_format,
+        args.server_aggregate,
+        write_mode=args.write_mode,
+        resolutions=args.resolutions,
+        asset_id=asset_ids[0],
+    )
     print(
-        f"ETL date={result['date']} window=[{result['window_start']}, {result['window_end']})\n"
+        f"ETL date={result['date']} asset={result['asset_id']} "
+        f"window=[{result['window_start']}, {result['window_end']})\n"
         f"Source rows: {result['source_rows']} -> 10-min rows: {result['agg_rows']}\n"
-        f"Inserted measurements: {result['inserted']}"
+        f"Inserted measurements: {result['inserted']}\n"
+        f"Stages: {format_stages(result['stages'])}"
     )
 
 
@@ -0,0 +1,153 @@
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+ETL_TRACE_MEMORY = os.getenv("ETL_TRACE_MEMORY", "0") == "1"
+# ru_maxrss is in KiB on Linux and in bytes on macOS.
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def max_rss_bytes() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT
+
+
+class Stage:
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.rows: Optional[int] = None
+        self.bytes: Optional[int] = None
+        self.peak_traced_bytes: Optional[int] = None
+        self.max_rss_bytes: Optional[int] = None
+
+    def merge(self, other: "Stage") -> None:
+        # A stage that runs several times (e.g. streaming writes) accumulates.
+        self.seconds += other.seconds
+        if other.rows is not None:
+            self.rows = (self.rows or 0) + other.rows
+        if other.bytes is not None:
+            self.bytes = (self.bytes or 0) + other.bytes
+        for name in ("peak_traced_bytes", "max_rss_bytes"):
+            value = getattr(other, name)
+            if value is not None:
+                setattr(self, name, max(getattr(self, name) or 0, value))
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        rows_per_s = None
+        if self.rows is not None and self.seconds > 0:
+            rows_per_s = round(self.rows / self.seconds, 1)
+        return {
+            "seconds": round(self.seconds, 6),
+            "rows": self.rows,
+            "rows_per_s": rows_per_s,
+            "bytes": self.bytes,
+            "peak_traced_bytes": self.peak_traced_bytes,
+            "max_rss_bytes": self.max_rss_bytes,
+        }
+
+
+class TracedPeak:
+    # tracemalloc has a single, process-global peak. A stage only keeps it when
+    # no other traced stage ran at the same time (e.g. with --workers > 1);
+    # overlapping stages would reset each other's peak and count each other's
+    # allocations, so they report max_rss_bytes only.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+        self._overlapped = False
+
+    def enter(self) -> bool:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._active += 1
+            if self._active > 1:
+                self._overlapped = True
+                return False
+            self._overlapped = False
+            tracemalloc.reset_peak()
+            return True
+
+    def exit(self, owner: bool) -> Optional[int]:
+        with self._lock:
+            self._active -= 1
+            if owner and not self._overlapped:
+                return tracemalloc.get_traced_memory()[1]
+            return None
+
+
+traced_peak = TracedPeak()
+
+
+class RunMetrics:
+    # Wall time, rows, bytes and memory per ETL stage. max_rss_bytes is the
+    # process high-water mark when the stage ends; with ETL_TRACE_MEMORY=1,
+    # peak_traced_bytes is tracemalloc's peak during a stage that ran alone.
+    def __init__(self, trace_memory: bool = ETL_TRACE_MEMORY):
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Stage] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        current = Stage(name)
+        owner = traced_peak.enter() if self.trace_memory else False
+        started = time.perf_counter()
+        try:
+            yield current
+        finally:
+            current.seconds = time.perf_counter() - started
+            if self.trace_memory:
+                current.peak_traced_bytes = traced_peak.exit(owner)
+            current.max_rss_bytes = max_rss_bytes()
+            with self._lock:
+                if name in self._stages:
+                    self._stages[name].merge(current)
+                else:
+                    self._stages[name] = current
+
+    def add(
+        self, name: str, rows: Optional[int] = None, bytes: Optional[int] = None
+    ) -> None:
+        # Counters measured outside a timed block, e.g. bytes of a stream.
+        current = Stage(name)
+        current.rows, current.bytes = rows, bytes
+        with self._lock:
+            self._stages.setdefault(name, Stage(name)).merge(current)
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self._started
+
+    def as_dict(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: stage.as_dict() for name, stage in self._stages.items()}
+
+
+@contextmanager
+def track(metrics: Optional[RunMetrics], name: str) -> Iterator[Stage]:
+    # Lets the ETL helpers take an optional RunMetrics without branching.
+    if metrics is None:
+        yield Stage(name)
+        return
+    with metrics.stage(name) as current:
+        yield current
+
+
+def format_stages(stages: Dict[str, dict]) -> str:
+    parts = []
+    for name, stage in stages.items():
+        part = f"{name}={stage['seconds']:.3f}s"
+        if stage["rows_per_s"] is not None:
+            part += f" ({stage['rows_per_s']:.0f} rows/s)"
+        if stage["bytes"] is not None:
+            part += f" {stage['bytes'] / 1024**2:.2f}MiB"
+        parts.append(part)
+    return " ".join(parts)
@@ -0,0 +1,160 @@
+import io
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+STATS = ["mean", "min", "max", "std"]
+
+
+class ChunkReader(io.RawIOBase):
+    # File-like view over an iterator of byte chunks (e.g. httpx iter_bytes), so
+    # pyarrow can decode record batches while the body is still arriving.
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def iter_arrow_frames(chunks: Iterable[bytes]) -> Iterator[pd.DataFrame]:
+    reader = pa.ipc.open_stream(io.BufferedReader(ChunkReader(chunks)))
+    for batch in reader:
+        yield batch.to_pandas().set_index("timestamp")
+
+
+class StreamingAggregator:
+    # Running count / Welford mean and M2 / min / max per bucket. Input must be
+    # ordered by time; every bucket before the one holding the latest row is
+    # closed and emitted, so only one bucket of state is carried between chunks.
+    def __init__(self, variables: List[str], rule: str, suffix: str = ""):
+        self.variables = variables
+        self.rule = rule
+        self.suffix = suffix
+        self.columns = [f"{var}_{stat}{suffix}" for var in variables for stat in STATS]
+        self._open: Optional[dict] = None
+        self.rows = 0
+
+    def _partials(self, chunk: pd.DataFrame) -> dict:
+        buckets = chunk.index.floor(self.rule)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        values = chunk[self.variables].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+
+        count = np.add.reduceat(valid, starts, axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.add.reduceat(filled, starts, axis=0) / count
+            sizes = np.diff(np.r_[starts, len(chunk)])
+            deviation = np.where(valid, filled - np.repeat(mean, sizes, axis=0), 0.0)
+            m2 = np.add.reduceat(deviation * deviation, starts, axis=0)
+        return {
+            "bucket": buckets[starts],
+            "count": count,
+            "mean": np.nan_to_num(mean),
+            "m2": m2,
+            "min": np.fmin.reduceat(values, starts, axis=0),
+            "max": np.fmax.reduceat(values, starts, axis=0),
+        }
+
+    def _merge_open(self, parts: dict) -> None:
+        # Chan et al. pairwise update of the carried bucket with the first one.
+        state = self._open
+        n_a, n_b = state["count"], parts["count"][0]
+        total = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = parts["mean"][0] - state["mean"]
+            mean = np.where(total > 0, state["mean"] + delta * n_b / total, 0.0)
+            m2 = (
+                state["m2"]
+                + parts["m2"][0]
+                + np.where(total > 0, delta * delta * n_a * n_b / total, 0.0)
+            )
+        parts["count"][0] = total
+        parts["mean"][0] = mean
+        parts["m2"][0] = m2
+        parts["min"][0] = np.fmin(state["min"], parts["min"][0])
+        parts["max"][0] = np.fmax(state["max"], parts["max"][0])
+
+    def _frame(self, parts: dict, rows: slice) -> pd.DataFrame:
+        count = parts["count"][rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(parts["m2"][rows] / (count - 1))
+        std[count < 2] = np.nan
+        mean = np.where(count > 0, parts["mean"][rows], np.nan)
+        stats = {
+            "mean": mean,
+            "min": parts["min"][rows],
+            "max": parts["max"][rows],
+            "std": std,
+        }
+        data = {
+            f"{var}_{stat}{self.suffix}": stats[stat][:, i]
+            for i, var in enumerate(self.variables)
+            for stat in STATS
+        }
+        index = pd.DatetimeIndex(parts["bucket"][rows], name="timestamp")
+        return pd.DataFrame(data, index=index, columns=self.columns)
+
+    def feed(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        if chunk.empty:
+            return self._frame(self._empty_parts(), slice(None))
+        if not chunk.index.is_monotonic_increasing:
+            raise ValueError("Streaming aggregation needs rows ordered by timestamp")
+        self.rows += len(chunk)
+
+        parts = self._partials(chunk)
+        if self._open is not None:
+            if parts["bucket"][0] < self._open["bucket"]:
+                raise ValueError("Streaming aggregation received out-of-order rows")
+            if parts["bucket"][0] == self._open["bucket"]:
+                self._merge_open(parts)
+            else:
+                parts = self._prepend_open(parts)
+
+        last = len(parts["bucket"]) - 1
+        self._open = {key: values[last] for key, values in parts.items()}
+        return self._frame(parts, slice(0, last))
+
+    def _prepend_open(self, parts: dict) -> dict:
+        state = self._open
+        merged = {
+            key: np.concatenate([state[key][None, :], values])
+            for key, values in parts.items()
+            if key != "bucket"
+        }
+        merged["bucket"] = parts["bucket"].insert(0, state["bucket"])
+        return merged
+
+    def _empty_parts(self) -> dict:
+        width = len(self.variables)
+        return {
+            "bucket": pd.DatetimeIndex([], tz="UTC"),
+            "count": np.empty((0, width)),
+            "mean": np.empty((0, width)),
+            "m2": np.empty((0, width)),
+            "min": np.empty((0, width)),
+            "max": np.empty((0, width)),
+        }
+
+    def flush(self) -> pd.DataFrame:
+        if self._open is None:
+            return self._frame(self._empty_parts(), slice(None))
+        state, self._open = self._open, None
+        parts = {key: value[None, :] for key, value in state.items() if key != "bucket"}
+        parts["bucket"] = pd.DatetimeIndex([state["bucket"]])
+        return self._frame(parts, slice(None))
@@ -1,8 +1,22 @@
 from fastapi import FastAPI
+from api.metrics import (
+    MetricsMiddleware,
+    instrument_sqlalchemy,
+    register_pool_collector,
+)
+from api.metrics import router as metrics_router
 from api.routes import router as api_router
 from api.source import router as source_router
+from api.source_async import router as source_async_router
+from api.target import router as target_router
 
 app = FastAPI(title="Delfos Technical Test API")
+app.add_middleware(MetricsMiddleware)
+instrument_sqlalchemy()
+register_pool_collector()
 
 app.include_router(api_router)
+app.include_router(metrics_router)
 app.include_router(source_router)
+app.include_router(source_async_router)
+app.include_router(target_router)
@@ -1,6 +1,7 @@
 import os
 import time
 import subprocess
+from typing import Optional
 
 import httpx
 import pytest
@@ -52,43 +53,43 @@ class APIHelper:
         return False
 
 
-def run_etl_for_date(date_str: str) -> subprocess.CompletedProcess:
+def run_in_api(cmd: list, env: Optional[dict] = None) -> subprocess.CompletedProcess:
+    env = env or {}
     if TestConfig.RUN_IN_CONTAINER:
         return subprocess.run(
-            [
-                "python",
-                "-m",
-                "etl.etl_daily",
-                "--date",
-                date_str,
-                "--base-url",
-                TestConfig.API_BASE_URL,
-            ],
+            cmd,
             capture_output=True,
             text=True,
             timeout=120,
+            env={**os.environ, **env},
         )
+    env_args = [arg for name, value in env.items() for arg in ("-e", f"{name}={value}")]
     return subprocess.run(
+        ["docker", "compose", "exec", "-T", *env_args, "api", *cmd],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+def run_etl(args: list, env: Optional[dict] = None) -> subprocess.CompletedProcess:
+    return run_in_api(
         [
-            "docker",
-            "compose",
-            "exec",
-            "-T",
-            "api",
             "python",
             "-m",
             "etl.etl_daily",
-            "--date",
-            date_str,
+            *args,
             "--base-url",
             TestConfig.API_BASE_URL,
         ],
-        capture_output=True,
-        text=True,
-        timeout=120,
+        env=env,
     )
 
 
+def run_etl_for_date(date_str: str) -> subprocess.CompletedProcess:
+    return run_etl(["--date", date_str])
+
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_environment():
     print("\n[SETUP] Iniciando ambiente de teste...")
@@ -1,9 +1,16 @@
-from datetime import timedelta
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 import httpx
+import pyarrow as pa
+import pyarrow.parquet as pq
+from prometheus_client.parser import text_string_to_metric_families
 from sqlalchemy import text
 
-from .conftest import DatabaseHelper, TestConfig
+from .conftest import DatabaseHelper, TestConfig, run_etl
 
 
 def test_api_health_check():
@@ -53,3 +60,711 @@ def test_filtro_variaveis():
     assert resp.status_code == 200
     data = resp.json()
     assert len(data) > 0
+
+
+def test_rota_data_ndjson():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = row[0].isoformat()
+        end = (row[0] + timedelta(hours=1)).isoformat()
+
+    resp = httpx.get(
+        f"{TestConfig.API_BASE_URL}/source/data",
+        params=[
+            ("start", start),
+            ("end", end),
+            ("variables", "wind_speed"),
+            ("format", "ndjson"),
+        ],
+        timeout=TestConfig.API_TIMEOUT,
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines() if line]
+    assert len(lines) == 60
+    assert set(lines[0]) == {"timestamp", "wind_speed"}
+
+
+def test_rota_data_arrow():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = row[0].isoformat()
+        end = (row[0] + timedelta(hours=1)).isoformat()
+
+    resp = httpx.get(
+        f"{TestConfig.API_BASE_URL}/source/data",
+        params=[
+            ("start", start),
+            ("end", end),
+            ("variables", "wind_speed"),
+            ("variables", "power"),
+        ],
+        headers={"Accept": "application/vnd.apache.arrow.stream"},
+        timeout=TestConfig.API_TIMEOUT,
+    )
+    assert resp.status_code == 200
+    table = pa.ipc.open_stream(resp.content).read_all()
+    assert table.num_rows == 60
+    assert table.column_names == ["timestamp", "wind_speed", "power"]
+
+
+def test_rota_data_parquet():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = (row[0] + timedelta(hours=1)).isoformat()
+        end = (row[0] + timedelta(hours=2)).isoformat()
+
+    params = [
+        ("start", start),
+        ("end", end),
+        ("variables", "wind_speed"),
+        ("variables", "power"),
+    ]
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        data = client.get("/source/data", params=params).json()
+        by_query = client.get("/source/data", params=params + [("format", "parquet")])
+        by_accept = client.get(
+            "/source/data",
+            params=params,
+            headers={"Accept": "application/vnd.apache.parquet"},
+        )
+
+    for resp in [by_query, by_accept]:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/vnd.apache.parquet")
+        table = pq.read_table(io.BytesIO(resp.content))
+        assert table.column_names == ["timestamp", "wind_speed", "power"]
+        assert table.num_rows == len(data) == 60
+        assert table.column("timestamp").to_pylist() == [
+            datetime.fromisoformat(item["timestamp"].replace("Z", "+00:00"))
+            for item in data
+        ]
+        assert table.column("power").to_pylist() == [item["power"] for item in data]
+
+
+def test_rota_aggregate():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = row[0].isoformat()
+        end = (row[0] + timedelta(hours=1)).isoformat()
+
+    resp = httpx.get(
+        f"{TestConfig.API_BASE_URL}/source/aggregate",
+        params=[
+            ("start", start),
+            ("end", end),
+            ("interval", "10min"),
+            ("variables", "power"),
+            ("stats", "mean"),
+            ("stats", "count"),
+        ],
+        timeout=TestConfig.API_TIMEOUT,
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert 6 <= len(data) <= 7
+    assert sum(item["power_count"] for item in data) == 60
+
+
+def test_rota_data_async_igual_sync():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = row[0].isoformat()
+        end = (row[0] + timedelta(hours=1)).isoformat()
+
+    params = [("start", start), ("end", end), ("variables", "power")]
+    sync_resp = httpx.get(
+        f"{TestConfig.API_BASE_URL}/source/data",
+        params=params,
+        timeout=TestConfig.API_TIMEOUT,
+    )
+    async_resp = httpx.get(
+        f"{TestConfig.API_BASE_URL}/async/source/data",
+        params=params,
+        timeout=TestConfig.API_TIMEOUT,
+    )
+    assert async_resp.status_code == 200
+    assert async_resp.json() == sync_resp.json()
+
+
+def test_rota_data_async_nao_bloqueia_health():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        first_ts = conn.execute(text("SELECT MIN(timestamp) FROM data")).scalar()
+
+    def stream(offset: int, format: str) -> httpx.Response:
+        # Janelas longas e distintas: sem blocos e sem cache de resposta.
+        start = first_ts + timedelta(minutes=offset)
+        params = {
+            "start": start.isoformat(),
+            "end": (start + timedelta(days=9)).isoformat(),
+            "format": format,
+        }
+        return httpx.get(
+            f"{TestConfig.API_BASE_URL}/async/source/data",
+            params=params,
+            timeout=TestConfig.API_TIMEOUT,
+        )
+
+    formats = ["parquet", "ndjson", "arrow", "parquet"]
+    latencies = []
+    with ThreadPoolExecutor(max_workers=len(formats)) as pool:
+        futures = [
+            pool.submit(stream, 21 + i, format) for i, format in enumerate(formats)
+        ]
+        with httpx.Client(base_url=TestConfig.API_BASE_URL, timeout=5) as client:
+            while not all(future.done() for future in futures):
+                started = time.perf_counter()
+                assert client.get("/health").status_code == 200
+                latencies.append(time.perf_counter() - started)
+        responses = [future.result() for future in futures]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.content for response in responses)
+    assert latencies
+    assert max(latencies) < 1.0
+
+
+def test_rota_data_cache_historico():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = (row[0] + timedelta(hours=2)).isoformat()
+        end = (row[0] + timedelta(hours=3)).isoformat()
+
+    params = [("start", start), ("end", end), ("variables", "power")]
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        first = client.get("/source/data", params=params)
+        before = client.get("/health/cache").json()["source_data"]
+        second = client.get("/source/data", params=params)
+        after = client.get("/health/cache").json()["source_data"]
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+
+def test_rota_data_blocos_sobrepostos():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = row[0] + timedelta(hours=30, minutes=7)
+
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        first = client.get(
+            "/source/data",
+            params={
+                "start": start.isoformat(),
+                "end": (start + timedelta(hours=3)).isoformat(),
+            },
+        )
+        before = client.get("/health/cache").json()["source_blocks"]
+        shifted = client.get(
+            "/source/data",
+            params={
+                "start": (start + timedelta(minutes=30)).isoformat(),
+                "end": (start + timedelta(hours=3, minutes=30)).isoformat(),
+            },
+        )
+        after = client.get("/health/cache").json()["source_blocks"]
+
+    assert first.status_code == 200
+    assert shifted.status_code == 200
+    assert len(shifted.json()) == len(first.json()) == 180
+    assert shifted.json()[:150] == first.json()[30:]
+    assert after["fetched_blocks"] - before["fetched_blocks"] <= 1
+
+
+def test_rota_data_ativo_carregado_depois():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        first_ts = conn.execute(text("SELECT MIN(timestamp) FROM data")).scalar()
+    start = first_ts + timedelta(hours=6)
+    end = start + timedelta(hours=2)
+    params = [("start", start.isoformat()), ("end", end.isoformat()), ("asset_id", 3)]
+
+    try:
+        with httpx.Client(
+            base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+        ) as client:
+            empty = client.get("/source/data", params=params + [("variables", "power")])
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO asset (id, name) VALUES (3, 'turbine-003') "
+                        "ON CONFLICT DO NOTHING"
+                    )
+                )
+                conn.execute(
+                    text(
+                        "INSERT INTO data (asset_id, timestamp, wind_speed, power, "
+                        "ambient_temperature) SELECT 3, timestamp, wind_speed, power, "
+                        "ambient_temperature FROM data WHERE asset_id = 1 "
+                        "AND timestamp >= :start AND timestamp < :end"
+                    ),
+                    {"start": start, "end": end},
+                )
+            loaded = client.get(
+                "/source/data", params=params + [("variables", "wind_speed")]
+            )
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM data WHERE asset_id = 3"))
+            conn.execute(text("DELETE FROM asset WHERE id = 3"))
+
+    assert empty.status_code == 200
+    assert empty.json() == []
+    assert loaded.status_code == 200
+    assert len(loaded.json()) == 120
+
+
+def arrow_rows(resp: httpx.Response) -> int:
+    return pa.ipc.open_stream(resp.content).read_all().num_rows
+
+
+def test_rota_data_resposta_vazia_nao_fica_em_cache():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        first_ts = conn.execute(text("SELECT MIN(timestamp) FROM data")).scalar()
+    start = first_ts + timedelta(hours=12)
+    end = start + timedelta(hours=2)
+    params = [("start", start.isoformat()), ("end", end.isoformat()), ("asset_id", 4)]
+    row_counts = {
+        "json": lambda resp: len(resp.json()),
+        "ndjson": lambda resp: len(resp.text.splitlines()),
+        "arrow": arrow_rows,
+    }
+
+    def query_all(client: httpx.Client) -> dict:
+        return {
+            (prefix, format): count(
+                client.get(
+                    f"{prefix}/source/data", params=params + [("format", format)]
+                )
+            )
+            for prefix in ["", "/async"]
+            for format, count in row_counts.items()
+        }
+
+    try:
+        with httpx.Client(
+            base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+        ) as client:
+            empty = query_all(client)
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO asset (id, name) VALUES (4, 'turbine-004') "
+                        "ON CONFLICT DO NOTHING"
+                    )
+                )
+                conn.execute(
+                    text(
+                        "INSERT INTO data (asset_id, timestamp, wind_speed, power, "
+                        "ambient_temperature) SELECT 4, timestamp, wind_speed, power, "
+                        "ambient_temperature FROM data WHERE asset_id = 1 "
+                        "AND timestamp >= :start AND timestamp < :end"
+                    ),
+                    {"start": start, "end": end},
+                )
+            loaded = query_all(client)
+            cached = query_all(client)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM data WHERE asset_id = 4"))
+            conn.execute(text("DELETE FROM asset WHERE id = 4"))
+
+    assert set(empty.values()) == {0}
+    assert set(loaded.values()) == {120}
+    assert cached == loaded
+
+
+def test_rota_data_janela_longa_sem_blocos():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        first_ts = conn.execute(text("SELECT MIN(timestamp) FROM data")).scalar()
+    windows = {
+        "/source/data": (first_ts + timedelta(minutes=11), timedelta(days=8)),
+        "/async/source/data": (first_ts + timedelta(minutes=13), timedelta(days=8)),
+    }
+
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        for path, (start, length) in windows.items():
+            with engine.connect() as conn:
+                expected = conn.execute(
+                    text(
+                        "SELECT COUNT(*) FROM data WHERE asset_id = 1 "
+                        "AND timestamp >= :start AND timestamp < :end"
+                    ),
+                    {"start": start, "end": start + length},
+                ).scalar()
+            before = client.get("/health/cache").json()["source_blocks"]
+            resp = client.get(
+                path,
+                params={
+                    "start": start.isoformat(),
+                    "end": (start + length).isoformat(),
+                    "format": "ndjson",
+                },
+            )
+            after = client.get("/health/cache").json()["source_blocks"]
+
+            assert resp.status_code == 200
+            lines = [json.loads(line) for line in resp.text.splitlines() if line]
+            assert len(lines) == expected > 0
+            assert lines[0]["timestamp"].endswith("Z")
+            assert after["fetches"] == before["fetches"]
+
+
+def test_rota_target_measurements_pivotada():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+    day = first_day + timedelta(days=4)
+    result = run_etl(["--date", day.isoformat(), "--resolutions", "10min,1h"])
+    assert result.returncode == 0, result.stderr
+
+    params = [
+        ("start", f"{day.isoformat()}T00:00:00Z"),
+        ("end", f"{(day + timedelta(days=1)).isoformat()}T00:00:00Z"),
+        ("resolution", "1h"),
+        ("signals", "power_mean"),
+        ("signals", "wind_speed_max"),
+    ]
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        resp = client.get("/target/measurements", params=params)
+        arrow_resp = client.get(
+            "/target/measurements", params=params + [("format", "arrow")]
+        )
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data) == 24
+    assert set(data[0]) == {"timestamp", "power_mean_1h", "wind_speed_max_1h"}
+    assert data[0]["timestamp"] == f"{day.isoformat()}T00:00:00Z"
+
+    assert arrow_resp.status_code == 200
+    table = pa.ipc.open_stream(arrow_resp.content).read_all()
+    assert table.num_rows == 24
+    assert table.column("power_mean_1h").to_pylist() == [
+        row["power_mean_1h"] for row in data
+    ]
+
+    params = [param for param in params if param[0] != "signals"]
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    try:
+        with httpx.Client(
+            base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+        ) as client:
+            before = client.get("/target/measurements", params=params).json()
+            with engine_alvo.begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO signal (asset_id, name) VALUES (1, 'extra_mean_1h')"
+                    )
+                )
+            after = client.get("/target/measurements", params=params).json()
+        assert "extra_mean_1h" not in before[0]
+        assert "extra_mean_1h" in after[0]
+        assert set(after[0]) - set(before[0]) == {"extra_mean_1h"}
+    finally:
+        with engine_alvo.begin() as conn:
+            conn.execute(text("DELETE FROM signal WHERE name = 'extra_mean_1h'"))
+
+
+def test_rota_target_measurements_nan_vira_null():
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    with engine_alvo.begin() as conn:
+        signal_id = conn.execute(
+            text(
+                "INSERT INTO signal (asset_id, name) VALUES (1, 'nan_check_10m') "
+                "RETURNING id"
+            )
+        ).scalar()
+        conn.execute(
+            text(
+                "INSERT INTO data (timestamp, signal_id, value) VALUES "
+                "('2000-01-01T00:00:00Z', :id, 'NaN'), "
+                "('2000-01-01T00:10:00Z', :id, 1.5)"
+            ),
+            {"id": signal_id},
+        )
+
+    params = [
+        ("start", "2000-01-01T00:00:00Z"),
+        ("end", "2000-01-02T00:00:00Z"),
+        ("signals", "nan_check_10m"),
+    ]
+    expected = [
+        {"timestamp": "2000-01-01T00:00:00Z", "nan_check_10m": None},
+        {"timestamp": "2000-01-01T00:10:00Z", "nan_check_10m": 1.5},
+    ]
+    try:
+        with httpx.Client(
+            base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+        ) as client:
+            as_json = client.get("/target/measurements", params=params)
+            as_ndjson = client.get(
+                "/target/measurements", params=params + [("format", "ndjson")]
+            )
+    finally:
+        with engine_alvo.begin() as conn:
+            conn.execute(
+                text("DELETE FROM data WHERE signal_id = :id"), {"id": signal_id}
+            )
+            conn.execute(text("DELETE FROM signal WHERE id = :id"), {"id": signal_id})
+
+    assert as_json.status_code == as_ndjson.status_code == 200
+    assert "NaN" not in as_json.text and "NaN" not in as_ndjson.text
+    assert json.loads(as_json.text) == expected
+    assert [json.loads(line) for line in as_ndjson.text.splitlines()] == expected
+
+
+def read_metric_samples(client: httpx.Client) -> dict:
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(resp.text)
+        for sample in family.samples
+    }
+
+
+def test_rota_metrics_latencia_e_sql():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = row[0].isoformat()
+        end = (row[0] + timedelta(hours=2)).isoformat()
+
+    route = (("method", "GET"), ("route", "/source/aggregate"))
+    requests = ("http_request_duration_seconds_count", (*route, ("status", "200")))
+    rows = ("http_response_rows_sum", route)
+    response_bytes = ("http_response_bytes_sum", route)
+    selects = (
+        "db_statement_duration_seconds_count",
+        (
+            ("database", TestConfig.FONTE_DB_URL.rsplit("/", 1)[-1]),
+            ("statement", "SELECT"),
+        ),
+    )
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        before = read_metric_samples(client)
+        resp = client.get(
+            "/source/aggregate",
+            params=[("start", start), ("end", end), ("format", "ndjson")],
+        )
+        after = read_metric_samples(client)
+
+    assert resp.status_code == 200
+    assert after[requests] == before.get(requests, 0) + 1
+    assert after[rows] - before.get(rows, 0) == len(resp.text.splitlines())
+    assert after[response_bytes] - before.get(response_bytes, 0) == len(resp.content)
+    assert after[selects] >= before.get(selects, 0) + 1
+    assert any(name == "db_pool_checkouts_total" for name, _ in after)
+
+
+def test_rota_health_pools_apos_requisicoes_concorrentes():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        first_ts = conn.execute(text("SELECT MIN(timestamp) FROM data")).scalar()
+
+    def aggregate(prefix: str, offset: int) -> httpx.Response:
+        # Janelas distintas para não responder do cache.
+        start = first_ts + timedelta(minutes=offset)
+        params = {
+            "start": start.isoformat(),
+            "end": (start + timedelta(hours=1)).isoformat(),
+            "interval": "10min",
+        }
+        return httpx.get(
+            f"{TestConfig.API_BASE_URL}{prefix}/source/aggregate",
+            params=params,
+            timeout=TestConfig.API_TIMEOUT,
+        )
+
+    requests = 12
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        before = client.get("/health/pools").json()
+        with ThreadPoolExecutor(max_workers=requests) as pool:
+            responses = list(
+                pool.map(
+                    aggregate,
+                    ["", "/async"] * (requests // 2),
+                    range(31, 31 + requests),
+                )
+            )
+        after = client.get("/health/pools").json()
+        samples = read_metric_samples(client)
+
+    assert all(response.status_code == 200 for response in responses)
+    for kind in ["sync", "async"]:
+        name = next(name for name in after if name.startswith(f"source:{kind}:"))
+        pool_after = after[name]
+        pool_before = before.get(name, {"checkouts": 0, "checkins": 0})
+        assert pool_after["checkouts"] - pool_before["checkouts"] >= requests // 2
+        assert pool_after["checkins"] - pool_before["checkins"] >= requests // 2
+        assert pool_after["checked_out"] == 0
+        assert pool_after["checkins"] == pool_after["checkouts"]
+        assert pool_after["timeouts"] == 0
+        assert pool_after["wait_seconds"] > 0
+        assert pool_after["status"]
+        metric = ("db_pool_checkouts_total", (("pool", name),))
+        assert samples[metric] >= pool_after["checkouts"]
+
+
+def test_rota_data_json_formato():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(
+                "SELECT timestamp, power FROM data WHERE asset_id = 1 "
+                "ORDER BY timestamp LIMIT 1"
+            )
+        ).fetchone()
+        start = row.timestamp
+        end = start + timedelta(minutes=30)
+
+    resp = httpx.get(
+        f"{TestConfig.API_BASE_URL}/source/data",
+        params=[
+            ("start", start.isoformat()),
+            ("end", end.isoformat()),
+            ("variables", "power"),
+            ("format", "json"),
+        ],
+        timeout=TestConfig.API_TIMEOUT,
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    data = resp.json()
+    assert len(data) == 30
+    assert list(data[0]) == [
+        "timestamp",
+        "asset_id",
+        "wind_speed",
+        "power",
+        "ambient_temperature",
+    ]
+    assert data[0]["timestamp"] == start.isoformat().replace("+00:00", "Z")
+    assert data[0]["asset_id"] == 1
+    assert data[0]["wind_speed"] is None
+    assert data[0]["ambient_temperature"] is None
+    assert data[0]["power"] == row.power
+
+
+def test_rota_data_paginada():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(timestamp) FROM data")).fetchone()
+        start = (row[0] + timedelta(hours=4)).isoformat()
+        end = (row[0] + timedelta(hours=7)).isoformat()
+
+    params = [("start", start), ("end", end), ("variables", "power")]
+    with httpx.Client(
+        base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+    ) as client:
+        full = client.get("/source/data", params=params).json()
+        for prefix in ["/source", "/async/source"]:
+            pages, cursor = [], None
+            while True:
+                page_params = params + [("limit", 50)]
+                if cursor is not None:
+                    page_params.append(("cursor", cursor))
+                resp = client.get(f"{prefix}/data", params=page_params)
+                assert resp.status_code == 200
+                pages.append(resp.json())
+                cursor = resp.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+            assert [len(page) for page in pages] == [50, 50, 50, 30]
+            assert [item for page in pages for item in page] == full
+
+        arrow = client.get(
+            "/source/data", params=params + [("limit", 50), ("format", "arrow")]
+        )
+        invalid = client.get("/source/data", params=params + [("cursor", "???")])
+
+    assert arrow.status_code == 200
+    assert pa.ipc.open_stream(arrow.content).read_all().num_rows == 50
+    assert "X-Next-Cursor" in arrow.headers
+    assert invalid.status_code == 400
+
+
+def test_rota_data_paginada_varios_ativos():
+    engine = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine.connect() as conn:
+        first_ts = conn.execute(text("SELECT MIN(timestamp) FROM data")).scalar()
+    start = first_ts + timedelta(hours=9)
+    end = start + timedelta(hours=3)
+    params = [
+        ("start", start.isoformat()),
+        ("end", end.isoformat()),
+        ("variables", "power"),
+        ("asset_id", 1),
+        ("asset_id", 2),
+    ]
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO asset (id, name) VALUES (2, 'turbine-002') "
+                "ON CONFLICT DO NOTHING"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO data (asset_id, timestamp, wind_speed, power, "
+                "ambient_temperature) SELECT 2, timestamp, wind_speed, power * 2, "
+                "ambient_temperature FROM data WHERE asset_id = 1 "
+                "AND timestamp >= :start AND timestamp < :end ON CONFLICT DO NOTHING"
+            ),
+            {"start": start, "end": end},
+        )
+    try:
+        with httpx.Client(
+            base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+        ) as client:
+            full = client.get("/source/data", params=params).json()
+            for prefix in ["/source", "/async/source"]:
+                pages, cursor = [], None
+                while True:
+                    page_params = params + [("limit", 50)]
+                    if cursor is not None:
+                        page_params.append(("cursor", cursor))
+                    resp = client.get(f"{prefix}/data", params=page_params)
+                    assert resp.status_code == 200
+                    pages.append(resp.json())
+                    cursor = resp.headers.get("X-Next-Cursor")
+                    if cursor is None:
+                        break
+                assert [len(page) for page in pages] == [50] * 7 + [10]
+                assert [item["asset_id"] for item in pages[3]] == [1] * 30 + [2] * 20
+                assert [item for page in pages for item in page] == full
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM data WHERE asset_id = 2"))
+            conn.execute(text("DELETE FROM asset WHERE id = 2"))
+
+    assert len(full) == 360
@@ -0,0 +1,216 @@
+import json
+from datetime import timedelta
+
+from sqlalchemy import create_engine, text
+
+from .conftest import DatabaseHelper, TestConfig, run_in_api
+
+
+COPY_DATAFRAME_SCRIPT = """
+import json
+import numpy as np
+import pandas as pd
+from db import common
+from db.utils import copy_dataframe
+frame = pd.DataFrame(
+    {
+        "timestamp": pd.date_range("2024-01-01 00:10", periods=4, freq="10min", tz="UTC"),
+        "signal_id": [1, 2, 3, 4],
+        "value": [0.1 + 0.2, np.nan, -1e-300, 3000.0],
+        "label": ["a,b", 'say "hi"', "line\\nbreak", None],
+    }
+)
+engine = common.get_engine(common.DB_TARGET_NAME)
+with engine.begin() as conn:
+    conn.exec_driver_sql(
+        "CREATE TEMP TABLE copy_check (timestamp timestamptz, signal_id integer, "
+        "value double precision, label text) ON COMMIT DROP"
+    )
+    copied = copy_dataframe(conn, "copy_check", frame)
+    empty = copy_dataframe(conn, "copy_check", frame.iloc[:0])
+    rows = conn.exec_driver_sql(
+        "SELECT timestamp, signal_id, value, label FROM copy_check ORDER BY signal_id"
+    ).fetchall()
+print(json.dumps({
+    "copied": copied,
+    "empty": empty,
+    "rows": [[ts.isoformat(), signal_id, value, label] for ts, signal_id, value, label in rows],
+}))
+"""
+
+
+def test_copy_dataframe_tipos_e_escape():
+    result = run_in_api(["python", "-c", COPY_DATAFRAME_SCRIPT])
+    assert result.returncode == 0, result.stderr
+    copied = json.loads(result.stdout)
+
+    assert copied["copied"] == 4
+    assert copied["empty"] == 0
+    assert copied["rows"] == [
+        ["2024-01-01T00:10:00+00:00", 1, 0.1 + 0.2, "a,b"],
+        ["2024-01-01T00:20:00+00:00", 2, None, 'say "hi"'],
+        ["2024-01-01T00:30:00+00:00", 3, -1e-300, "line\nbreak"],
+        ["2024-01-01T00:40:00+00:00", 4, 3000.0, None],
+    ]
+
+
+PARTITION_DATABASES = {"source": "partition_source", "target": "partition_target"}
+PARTITION_ENV = {
+    "DB_SOURCE_NAME": PARTITION_DATABASES["source"],
+    "DB_TARGET_NAME": PARTITION_DATABASES["target"],
+    "DB_PARTITION_BY": "day",
+    "SOURCE_SEED_DAYS": "3",
+}
+
+
+def database_url(db_name: str) -> str:
+    return TestConfig.FONTE_DB_URL.rsplit("/", 1)[0] + f"/{db_name}"
+
+
+def drop_databases(db_names) -> None:
+    engine = create_engine(database_url("postgres"), isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        for db_name in db_names:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{db_name}" WITH (FORCE)'))
+    engine.dispose()
+
+
+def read_partitions(db_name: str) -> dict:
+    engine = DatabaseHelper.get_engine(database_url(db_name))
+    with engine.connect() as conn:
+        partitioned = conn.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass('data'))"
+            )
+        ).scalar()
+        rows = conn.execute(
+            text(
+                "SELECT tableoid::regclass::text, MIN(timestamp), MAX(timestamp), "
+                "COUNT(*) FROM data GROUP BY 1 ORDER BY 1"
+            )
+        ).fetchall()
+    engine.dispose()
+    assert partitioned
+    return {name: (first, last, count) for name, first, last, count in rows}
+
+
+def test_particionamento_diario_e_drop_before():
+    drop_databases(PARTITION_DATABASES.values())
+    try:
+        result = run_in_api(["python", "-m", "db.setup_all"], env=PARTITION_ENV)
+        assert result.returncode == 0, result.stderr
+
+        source = read_partitions(PARTITION_DATABASES["source"])
+        target = read_partitions(PARTITION_DATABASES["target"])
+        assert sum(count for _, _, count in source.values()) == 3 * 1440
+        assert len(source) == 4
+        for partitions in [source, target]:
+            for name, (first, last, _) in partitions.items():
+                assert name == f"data_p{first:%Y%m%d}" == f"data_p{last:%Y%m%d}"
+
+        cutoff = min(first for first, _, _ in source.values()).date() + timedelta(1)
+        result = run_in_api(
+            [
+                "python",
+                "-m",
+                "db.partitioning",
+                "--db",
+                "source",
+                "--drop-before",
+                cutoff.isoformat(),
+            ],
+            env=PARTITION_ENV,
+        )
+        assert result.returncode == 0, result.stderr
+        first_partition = min(source)
+        assert result.stdout.strip() == f"Dropped partitions: {first_partition}"
+
+        remaining = read_partitions(PARTITION_DATABASES["source"])
+        assert set(remaining) == set(source) - {first_partition}
+        assert all(first.date() >= cutoff for first, _, _ in remaining.values())
+    finally:
+        drop_databases(PARTITION_DATABASES.values())
+
+
+SEED_DATABASE = "seed_source"
+SEED_ENV = {
+    "DB_SOURCE_NAME": SEED_DATABASE,
+    "DB_PARTITION_BY": "",
+    "SOURCE_SEED": "11",
+    "SOURCE_SEED_DAYS": "2",
+    "SOURCE_SEED_ASSETS": "2",
+    "SOURCE_GENERATION_CHUNK_ROWS": "1000",
+}
+SEED_SOURCE_SCRIPT = """
+import json, os
+import numpy as np
+import pandas as pd
+from db import common
+from db.source_setup import create_source_schema, iter_source_frames, seed_source_data
+common.create_database_if_not_exists(common.DB_SOURCE_NAME)
+engine = common.get_engine(common.DB_SOURCE_NAME)
+create_source_schema(engine)
+start, end, inserted = seed_source_data(engine)
+again = seed_source_data(engine)
+columns = ["asset_id", "timestamp", "wind_speed", "power", "ambient_temperature"]
+stored = pd.read_sql(
+    "SELECT asset_id, timestamp, wind_speed, power, ambient_temperature FROM data "
+    "ORDER BY asset_id, timestamp",
+    engine,
+)
+periods = int((end - start).total_seconds() // 60)
+seed = int(os.environ["SOURCE_SEED"])
+expected = pd.concat(iter_source_frames(start, periods, seed, asset_ids=[1, 2]))
+other = next(iter_source_frames(start, periods, seed + 1, asset_ids=[1, 2]))
+with engine.connect() as conn:
+    days = conn.exec_driver_sql(
+        "SELECT asset_id, DATE(timestamp)::text, COUNT(*), "
+        "EXTRACT(EPOCH FROM MAX(timestamp) - MIN(timestamp)) / 60 + 1 "
+        "FROM data GROUP BY 1, 2 ORDER BY 1, 2"
+    ).fetchall()
+print(json.dumps({
+    "inserted": inserted,
+    "again": again[2],
+    "same_range": again[:2] == (start, end),
+    "stored": len(stored),
+    "deterministic": bool(
+        np.array_equal(stored["asset_id"], expected["asset_id"])
+        and np.array_equal(
+            pd.to_datetime(stored["timestamp"], utc=True), expected["timestamp"]
+        )
+        and all(
+            np.array_equal(stored[name], expected[name]) for name in columns[2:]
+        )
+    ),
+    "other_seed_differs": not np.array_equal(
+        other["power"], expected["power"][: len(other)]
+    ),
+    "days": [[asset_id, day, count, int(span)] for asset_id, day, count, span in days],
+}))
+"""
+
+
+def test_seed_fonte_deterministico_e_idempotente():
+    drop_databases([SEED_DATABASE])
+    try:
+        result = run_in_api(["python", "-c", SEED_SOURCE_SCRIPT], env=SEED_ENV)
+        assert result.returncode == 0, result.stderr
+        seeded = json.loads(result.stdout)
+    finally:
+        drop_databases([SEED_DATABASE])
+
+    assert seeded["inserted"] == 2 * 2 * 1440
+    assert seeded["stored"] == seeded["inserted"]
+    assert seeded["again"] == 0
+    assert seeded["same_range"]
+    assert seeded["deterministic"]
+    assert seeded["other_seed_differs"]
+
+    by_asset = {1: {}, 2: {}}
+    for asset_id, day, count, span in seeded["days"]:
+        # Um minuto por linha, sem buracos nem repetições dentro do dia.
+        assert 0 < count == span <= 1440
+        by_asset[asset_id][day] = count
+    assert by_asset[1] == by_asset[2]
+    assert sum(by_asset[1].values()) == 2 * 1440
@@ -1,6 +1,13 @@
+import json
+from datetime import datetime, time, timedelta, timezone
+
+import httpx
+import numpy as np
+import pandas as pd
 from sqlalchemy import text
 
-from .conftest import DatabaseHelper, TestConfig, run_etl_for_date
+from etl.etl_daily import AGG_FUNCS, aggregate_10min_numpy
+from .conftest import DatabaseHelper, TestConfig, run_etl, run_etl_for_date, run_in_api
 
 
 def test_etl_execucao_basica():
@@ -46,3 +53,422 @@ def test_etl_agregacoes():
         if rows:
             for row in rows:
                 assert row.records_per_hour > 0
+
+
+def test_etl_incremental_grava_marca_dagua():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        last_ts = conn.execute(text("SELECT MAX(timestamp) FROM data")).scalar()
+
+    since = (last_ts - timedelta(hours=2)).isoformat()
+    result = run_etl(["--incremental", "--since", since])
+    assert result.returncode == 0, result.stderr
+
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    with engine_alvo.connect() as conn:
+        watermark = conn.execute(
+            text("SELECT MIN(last_timestamp) FROM etl_watermark")
+        ).scalar()
+    assert watermark == last_ts
+
+
+READ_ARCHIVE_SCRIPT = """
+import json, sys
+from datetime import datetime
+from etl.archive import read_archived_window
+start, end = (datetime.fromisoformat(arg) for arg in sys.argv[1:3])
+frame = read_archived_window(start, end, ["power"])
+rows = None if frame is None else [[ts.isoformat(), v] for ts, v in frame["power"].items()]
+print(json.dumps(rows))
+"""
+
+
+def test_arquivo_colunar_igual_banco():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+        day = first_day + timedelta(days=1)
+        start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        end = start + timedelta(days=1)
+        rows = conn.execute(
+            text(
+                "SELECT timestamp, power FROM data "
+                "WHERE timestamp >= :start AND timestamp < :end ORDER BY timestamp"
+            ),
+            {"start": start, "end": end},
+        ).fetchall()
+
+    result = run_in_api(["python", "-m", "etl.archive", "--start", day.isoformat()])
+    assert result.returncode == 0, result.stderr
+
+    # Read where the ETL reads it: the archive lives in the API container.
+    result = run_in_api(
+        ["python", "-c", READ_ARCHIVE_SCRIPT, start.isoformat(), end.isoformat()]
+    )
+    assert result.returncode == 0, result.stderr
+    archived = json.loads(result.stdout)
+    assert archived is not None
+    assert len(archived) == len(rows)
+    assert [datetime.fromisoformat(ts) for ts, _ in archived] == [
+        row.timestamp for row in rows
+    ]
+    assert [power for _, power in archived] == [row.power for row in rows]
+
+    result = run_etl_for_date(day.isoformat())
+    assert result.returncode == 0, result.stderr
+
+
+def test_agregacao_numpy_igual_pandas():
+    index = pd.date_range(
+        "2024-01-01 00:03", periods=3 * 1440, freq="1min", tz="UTC", name="timestamp"
+    )
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(
+        {
+            "wind_speed": rng.normal(8, 2, len(index)),
+            "power": rng.normal(900, 300, len(index)),
+        },
+        index=index,
+    )
+    df.iloc[5:40, 0] = np.nan
+    df.iloc[100, 1] = np.nan
+    keep = np.ones(len(df), dtype=bool)
+    keep[200:260] = False
+    keep[rng.integers(0, len(df), 300)] = False
+    df = df[keep]
+
+    expected = df.resample("10min").agg(AGG_FUNCS)
+    expected.columns = [f"{var}_{stat}_10m" for var, stat in expected.columns]
+
+    result = aggregate_10min_numpy(df)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False, rtol=1e-10)
+
+    irregular = df.set_axis(df.index + pd.Timedelta(seconds=1))
+    assert aggregate_10min_numpy(irregular) is None
+
+
+def test_etl_stream_igual_diario():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+    day = (first_day + timedelta(days=2)).isoformat()
+    query = text(
+        "SELECT d.timestamp, s.name, d.value FROM data d "
+        "JOIN signal s ON s.id = d.signal_id "
+        "WHERE DATE(d.timestamp) = :day AND s.name LIKE '%\\_10m' "
+        "ORDER BY d.timestamp, s.name"
+    )
+
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    assert run_etl_for_date(day).returncode == 0
+    with engine_alvo.connect() as conn:
+        daily = conn.execute(query, {"day": day}).fetchall()
+
+    result = run_etl(["--stream", "--date", day])
+    assert result.returncode == 0, result.stderr
+    with engine_alvo.connect() as conn:
+        streamed = conn.execute(query, {"day": day}).fetchall()
+
+    assert len(streamed) == len(daily) > 0
+    for got, expected in zip(streamed, daily):
+        assert got[:2] == expected[:2]
+        assert abs(got[2] - expected[2]) <= 1e-9 * max(abs(expected[2]), 1)
+
+
+def test_etl_stream_rejeita_opcoes_ignoradas():
+    for extra, flag in [
+        (["--resolutions", "10min,1h"], "--resolutions"),
+        (["--source-format", "json"], "--source-format"),
+        (["--server-aggregate"], "--server-aggregate"),
+    ]:
+        result = run_etl(["--stream", "--date", "2000-01-01", *extra])
+        assert result.returncode == 2
+        assert flag in result.stderr
+
+
+def test_etl_rollups_hora_e_dia():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+        day = (first_day + timedelta(days=3)).isoformat()
+        expected_mean, expected_std = conn.execute(
+            text(
+                "SELECT AVG(power), STDDEV_SAMP(power) FROM data "
+                "WHERE DATE(timestamp) = :day"
+            ),
+            {"day": day},
+        ).one()
+
+    result = run_etl(["--date", day, "--resolutions", "10min,1h,1d"])
+    assert result.returncode == 0, result.stderr
+
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    with engine_alvo.connect() as conn:
+        rows = dict(
+            conn.execute(
+                text(
+                    "SELECT s.name, COUNT(*) FROM data d "
+                    "JOIN signal s ON s.id = d.signal_id "
+                    "WHERE DATE(d.timestamp) = :day GROUP BY s.name"
+                ),
+                {"day": day},
+            ).fetchall()
+        )
+        daily = dict(
+            conn.execute(
+                text(
+                    "SELECT s.name, d.value FROM data d "
+                    "JOIN signal s ON s.id = d.signal_id "
+                    "WHERE DATE(d.timestamp) = :day AND s.name LIKE 'power\\_%\\_1d'"
+                ),
+                {"day": day},
+            ).fetchall()
+        )
+
+    assert rows["power_mean_10m"] == 144
+    assert rows["power_mean_1h"] == 24
+    assert rows["power_mean_1d"] == 1
+    assert abs(daily["power_mean_1d"] - expected_mean) < 1e-6
+    assert abs(daily["power_std_1d"] - expected_std) < 1e-6
+
+
+def test_etl_multiplos_ativos_em_paralelo():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+    day = (first_day + timedelta(days=5)).isoformat()
+    with engine_fonte.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO asset (id, name) VALUES (2, 'turbine-002') "
+                "ON CONFLICT DO NOTHING"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO data (asset_id, timestamp, wind_speed, power, ambient_temperature) "
+                "SELECT 2, timestamp, wind_speed, power * 2, ambient_temperature FROM data "
+                "WHERE asset_id = 1 AND DATE(timestamp) = :day ON CONFLICT DO NOTHING"
+            ),
+            {"day": day},
+        )
+
+    try:
+        result = run_etl(["--date", day, "--assets", "1,2", "--workers", "2"])
+        assert result.returncode == 0, result.stderr
+
+        engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+        with engine_alvo.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT s.asset_id, d.timestamp, d.value FROM data d "
+                    "JOIN signal s ON s.id = d.signal_id "
+                    "WHERE DATE(d.timestamp) = :day AND s.name = 'power_mean_10m' "
+                    "ORDER BY s.asset_id, d.timestamp"
+                ),
+                {"day": day},
+            ).fetchall()
+        by_asset = {1: {}, 2: {}}
+        for asset_id, ts, value in rows:
+            by_asset[asset_id][ts] = value
+        assert len(by_asset[1]) == len(by_asset[2]) == 144
+        for ts, value in by_asset[1].items():
+            assert abs(by_asset[2][ts] - 2 * value) <= 1e-9 * max(value, 1)
+
+        with httpx.Client(
+            base_url=TestConfig.API_BASE_URL, timeout=TestConfig.API_TIMEOUT
+        ) as client:
+            resp = client.get(
+                "/source/data",
+                params=[
+                    ("start", f"{day}T00:00:00Z"),
+                    ("end", f"{day}T01:00:00Z"),
+                    ("variables", "power"),
+                    ("asset_id", 1),
+                    ("asset_id", 2),
+                    ("format", "ndjson"),
+                ],
+            )
+        assert resp.status_code == 200
+        lines = [json.loads(line) for line in resp.text.splitlines() if line]
+        assert [line["asset_id"] for line in lines] == [1] * 60 + [2] * 60
+        assert lines[60]["power"] == 2 * lines[0]["power"]
+    finally:
+        with engine_fonte.begin() as conn:
+            conn.execute(text("DELETE FROM data WHERE asset_id = 2"))
+            conn.execute(text("DELETE FROM asset WHERE id = 2"))
+
+
+def test_etl_historico_de_execucao():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+    day = (first_day + timedelta(days=2)).isoformat()
+
+    result = run_etl_for_date(day)
+    assert result.returncode == 0, result.stderr
+    assert "Stages: " in result.stdout
+
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    with engine_alvo.connect() as conn:
+        run = conn.execute(
+            text(
+                "SELECT mode, status, window_start, source_rows, inserted, "
+                "duration_s, stages FROM etl_run ORDER BY id DESC LIMIT 1"
+            )
+        ).one()
+
+    assert run.mode == "daily"
+    assert run.status == "success"
+    assert run.window_start.date().isoformat() == day
+    assert run.source_rows == 1440
+    assert run.inserted == 144 * 8
+    assert run.duration_s > 0
+    assert run.stages["aggregate"]["rows"] == run.source_rows
+    assert run.stages["write_copy"]["rows"] == run.inserted
+    for name in ["aggregate", "write_prepare", "write_copy"]:
+        assert run.stages[name]["seconds"] >= 0
+        assert run.stages[name]["max_rss_bytes"] > 0
+    fetched = run.stages.get("fetch") or run.stages["archive_read"]
+    assert fetched["seconds"] >= 0
+
+
+def test_etl_upsert_reexecucao_altera_e_remove():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+    day = (first_day + timedelta(days=6)).isoformat()
+    snapshot = text(
+        "SELECT d.signal_id, d.timestamp, d.value FROM data d "
+        "JOIN signal s ON s.id = d.signal_id "
+        "WHERE DATE(d.timestamp) = :day AND s.asset_id = 1 "
+        "AND s.name LIKE '%\\_10m'"
+    )
+    last_run = text("SELECT status, inserted FROM etl_run ORDER BY id DESC LIMIT 1")
+
+    result = run_etl(["--date", day, "--write-mode", "upsert"])
+    assert result.returncode == 0, result.stderr
+
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    with engine_alvo.begin() as conn:
+        expected = {
+            (signal_id, ts): value
+            for signal_id, ts, value in conn.execute(snapshot, {"day": day})
+        }
+        power_id = conn.execute(
+            text("SELECT id FROM signal WHERE asset_id = 1 AND name = 'power_mean_10m'")
+        ).scalar()
+        # One value drifts and one bucket no longer exists in the source aggregation.
+        conn.execute(
+            text(
+                "UPDATE data SET value = value + 1000 "
+                "WHERE signal_id = :signal_id AND timestamp = :ts"
+            ),
+            {"signal_id": power_id, "ts": f"{day}T00:00:00Z"},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO data (timestamp, signal_id, value) "
+                "VALUES (:ts, :signal_id, 1)"
+            ),
+            {"signal_id": power_id, "ts": f"{day}T00:05:00Z"},
+        )
+
+    result = run_etl(["--date", day, "--write-mode", "upsert"])
+    assert result.returncode == 0, result.stderr
+
+    with engine_alvo.connect() as conn:
+        rerun = {
+            (signal_id, ts): value
+            for signal_id, ts, value in conn.execute(snapshot, {"day": day})
+        }
+        status, inserted = conn.execute(last_run).one()
+
+    assert len(expected) == 144 * 8
+    assert rerun == expected
+    assert status == "success"
+    assert inserted == 1
+
+
+# Um arquivo colunar cujo índice aponta para um dia sem colunas: a leitura
+# desse dia falha, os demais seguem pela API.
+BROKEN_ARCHIVE_SCRIPT = """
+import json, os, shutil, sys
+archive_dir, asset_id, day = sys.argv[1:]
+shutil.rmtree(archive_dir, ignore_errors=True)
+os.makedirs(os.path.join(archive_dir, f"asset_{asset_id}"))
+index = {"version": 1, "variables": [], "days": {day: {"rows": 10}}}
+with open(os.path.join(archive_dir, f"asset_{asset_id}", "index.json"), "w") as f:
+    json.dump(index, f)
+"""
+
+
+def test_etl_backfill_paralelo_com_dia_falho():
+    engine_fonte = DatabaseHelper.get_engine(TestConfig.FONTE_DB_URL)
+    with engine_fonte.connect() as conn:
+        first_day = conn.execute(text("SELECT DATE(MIN(timestamp)) FROM data")).scalar()
+        asset_id = conn.execute(text("SELECT MIN(id) FROM asset")).scalar()
+        days = [
+            (first_day + timedelta(days=offset)).isoformat() for offset in (7, 8, 9)
+        ]
+        expected = dict(
+            conn.execute(
+                text(
+                    "SELECT DATE(timestamp)::text, "
+                    "COUNT(DISTINCT FLOOR(EXTRACT(EPOCH FROM timestamp) / 600)) "
+                    "FROM data WHERE asset_id = :asset_id "
+                    "AND DATE(timestamp) BETWEEN :first AND :last GROUP BY 1"
+                ),
+                {"asset_id": asset_id, "first": days[0], "last": days[-1]},
+            ).fetchall()
+        )
+    failed_day = days[0]
+    query = text(
+        "SELECT DATE(d.timestamp)::text, COUNT(DISTINCT d.timestamp) FROM data d "
+        "JOIN signal s ON s.id = d.signal_id "
+        "WHERE s.asset_id = :asset_id AND s.name = 'power_mean_10m' "
+        "AND DATE(d.timestamp) BETWEEN :first AND :last GROUP BY 1"
+    )
+    params = {"asset_id": asset_id, "first": days[0], "last": days[-1]}
+
+    engine_alvo = DatabaseHelper.get_engine(TestConfig.ALVO_DB_URL)
+    with engine_alvo.begin() as conn:
+        conn.execute(
+            text(
+                "DELETE FROM data WHERE DATE(timestamp) BETWEEN :first AND :last "
+                "AND signal_id IN (SELECT id FROM signal WHERE asset_id = :asset_id)"
+            ),
+            params,
+        )
+
+    archive_dir = "/tmp/etl_backfill_archive"
+    result = run_in_api(
+        ["python", "-c", BROKEN_ARCHIVE_SCRIPT, archive_dir, str(asset_id), failed_day]
+    )
+    assert result.returncode == 0, result.stderr
+    try:
+        result = run_etl(
+            [
+                "--start",
+                days[0],
+                "--end",
+                days[-1],
+                "--assets",
+                str(asset_id),
+                "--workers",
+                "2",
+            ],
+            env={"SOURCE_ARCHIVE_DIR": archive_dir},
+        )
+    finally:
+        run_in_api(["rm", "-rf", archive_dir])
+
+    assert result.returncode == 1
+    assert f"ETL date={failed_day} asset={asset_id} FAILED" in result.stdout
+    assert f"Failed date/asset: {failed_day}/{asset_id}" in result.stdout
+    assert "2/3 tasks" in result.stdout
+    with engine_alvo.connect() as conn:
+        written = dict(conn.execute(query, params).fetchall())
+    assert failed_day not in written
+    for day in days[1:]:
+        assert written[day] == expected[day] > 0